@@ -10,7 +10,9 @@
         - Outbound: Send Delivery Orders to e-Transport TMS upon validation
         - Tracking: Manual fetch of tracking status from e-Transport
         - Webhooks: Receive status updates via webhooks (optional)
-        - Temperature support: AM (Ambiente), FR (Frío), CO (Congelado)
+        - Mass send: queue a list selection and send it in background batches
+        - Status manifests: bulk import of CSV / JSON Lines status files
+        - Temperature support: AM (Ambiente), FR (Frío), CO (Congelado), per product or default
         - Delivery time slots integration
         
         API Endpoints used:
@@ -23,8 +25,16 @@
     'version': '19.0.2.0.0',
     'depends': ['stock', 'sale_stock'],
     'data': [
+        'security/ir.model.access.csv',
+        'data/ir_sequence_data.xml',
+        'data/mail_message_subtype_data.xml',
+        'data/ir_cron_data.xml',
         'views/res_config_settings_views.xml',
         'views/stock_picking_views.xml',
+        'views/product_template_views.xml',
+        'views/logistics_3pl_send_batch_views.xml',
+        'views/logistics_3pl_event_views.xml',
+        'wizard/logistics_3pl_manifest_import_views.xml',
     ],
     'license': 'LGPL-3',
 }
@@ -1,14 +1,233 @@
-from odoo import http, _
+from odoo import http
 from odoo.http import request, Response
-from markupsafe import Markup
+import collections
+import io
+import itertools
 import json
 import logging
-from ..models.stock_picking import _write_debug_log
+import os
+import random
+import threading
+import time
+from ..models.stock_picking import (
+    _record_traffic, _log_sampled, _is_debug_mode, _LazyJSON, _3pl_timed, _lap, _queue_debug_log,
+    _iter_manifest_rows, _try_advisory_slot, _release_advisory_slot, _advisory_slots_in_use,
+    WEBHOOK_SLOT_LOCK, WEBHOOK_VALIDATION_SLOT_LOCK, MANIFEST_SLOT_LOCK,
+)
 
 _logger = logging.getLogger(__name__)
 
+# Maximum order references per status API call
+STATUS_MAX_REFS = 200
+# Longest seconds a status answer is cached, whatever the setting (see _StatusCache)
+STATUS_CACHE_MAX_TTL = 60
+# Lines not applied that are listed in a manifest import answer
+MANIFEST_MAX_ISSUES = 500
+# Minimum seconds between two warnings about shed webhooks, per worker
+WEBHOOK_SHED_LOG_INTERVAL = 10
+
+
+class _StatusCache:
+    """
+    Per-process cache of status lookups, keyed by (database, order ref).
+
+    Entries expire after the configured TTL, capped to STATUS_CACHE_MAX_TTL.
+    A webhook only invalidates the entries of the worker that processed it:
+    the other workers, and the manifest imports and background sends, which
+    do not invalidate at all, may answer with the previous status until the
+    entry expires.
+    """
+
+    def __init__(self, max_size=20000):
+        self.max_size = max_size
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        hits = {}
+        with self._lock:
+            for key in keys:
+                entry = self._data.get(key)
+                if entry and entry[0] > now:
+                    hits[key] = entry[1]
+        return hits
+
+    def set_many(self, items, ttl):
+        expires = time.monotonic() + ttl
+        with self._lock:
+            self._data.update((key, (expires, value)) for key, value in items.items())
+            if len(self._data) > self.max_size:
+                now = time.monotonic()
+                for key in [key for key, (exp, _value) in self._data.items() if exp <= now]:
+                    del self._data[key]
+                if len(self._data) > self.max_size:
+                    # Still full of live entries: drop the oldest half
+                    for key in list(itertools.islice(self._data, len(self._data) // 2)):
+                        del self._data[key]
+
+    def invalidate_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+
+_status_cache = _StatusCache()
+
+
+class _WebhookGate:
+    """
+    Per-process admission control of the webhook and manifest routes.
+
+    Counts the webhooks in flight in this worker (a threaded server runs
+    several at once) and, since the worker started, the ones shed or deferred
+    by reason. The database-wide limit is enforced with advisory locks, see
+    Logistics3PLController._webhook_admit.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.shed = collections.Counter()
+        self.deferred = collections.Counter()
+        self._last_warning = 0.0
+        self._lock = threading.Lock()
+
+    def enter(self, limit):
+        with self._lock:
+            if limit and self.in_flight >= limit:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def count_shed(self, reason):
+        """Count a shed request; returns True when it is time to log a warning about it."""
+        with self._lock:
+            self.shed[reason] += 1
+            now = time.monotonic()
+            if now - self._last_warning < WEBHOOK_SHED_LOG_INTERVAL:
+                return False
+            self._last_warning = now
+            return True
+
+    def count_deferred(self, reason):
+        with self._lock:
+            self.deferred[reason] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'in_flight_worker': self.in_flight,
+                'shed': dict(self.shed),
+                'deferred': dict(self.deferred),
+            }
+
+
+_webhook_gate = _WebhookGate()
+
+
+def _json_response(data, status=200, headers=None):
+    return Response(
+        json.dumps(data),
+        status=status,
+        headers=headers,
+        content_type='application/json'
+    )
+
+
 class Logistics3PLController(http.Controller):
 
+    def _check_api_key(self, log_prefix):
+        """
+        Check the ``Authorization: Bearer <api key>`` header (same key as the API calls).
+
+        Returns an error response to send back, or None when the caller is authorized.
+        """
+        auth_header = request.httprequest.headers.get('Authorization', '')
+        auth_token = None
+        if auth_header.startswith('Bearer '):
+            auth_token = auth_header[7:]  # Remove 'Bearer ' prefix
+
+        # Use sudo to access config without user context
+        stored_key = request.env['ir.config_parameter'].sudo().get_param('logistics_3pl_connector.api_key')
+
+        if not stored_key:
+            _logger.error("%s: API key not configured", log_prefix)
+            return _json_response({'status': 'error', 'message': '3PL integration not configured on server'}, 500)
+
+        if auth_token != stored_key:
+            _logger.warning("%s: Unauthorized - %s", log_prefix, "token mismatch" if auth_token else "no bearer token")
+            return _json_response({'status': 'error', 'message': 'Unauthorized'}, 401)
+        return None
+
+    def _webhook_limits(self):
+        config = request.env['ir.config_parameter'].sudo()
+        limits = {
+            name: int(config.get_param(f'logistics_3pl_connector.webhook_{name}', default) or 0)
+            for name, default in (('max_per_worker', 0), ('max_concurrent', 0), ('max_validations', 0),
+                                  ('retry_after', 5))
+        }
+        limits['manifest_max_concurrent'] = int(
+            config.get_param('logistics_3pl_connector.manifest_max_concurrent', 0) or 0)
+        return limits
+
+    def _webhook_admit(self, limits):
+        """
+        Admit a webhook within the concurrency limits, before any work on it.
+
+        Takes a place in this worker (max_per_worker) and one of the slots
+        shared by all workers of the database (max_concurrent, an advisory
+        lock held until the transaction ends). Returns None when admitted, the
+        caller must then release the worker place with _webhook_gate.leave();
+        otherwise returns the 503/429 answer to send back.
+        """
+        if not _webhook_gate.enter(limits['max_per_worker']):
+            return self._webhook_shed('worker', 503, limits)
+        if limits['max_concurrent'] and _try_advisory_slot(
+                request.env.cr, WEBHOOK_SLOT_LOCK, limits['max_concurrent']) is None:
+            _webhook_gate.leave()
+            return self._webhook_shed('database', 429, limits)
+        return None
+
+    def _manifest_admit(self, limits):
+        """
+        Admit a manifest import within the concurrency limits, see _webhook_admit.
+
+        Takes a place in this worker, shared with the webhooks, and one of the
+        manifest_max_concurrent slots of the database. The import commits every
+        batch, so its slot is a session-level advisory lock. Returns
+        ``(slot, None)`` when admitted (slot is None without a database limit),
+        the caller must then release the worker place with _webhook_gate.leave()
+        and the slot with _release_advisory_slot(); otherwise returns
+        ``(None, response)`` with the 503/429 answer to send back.
+        """
+        if not _webhook_gate.enter(limits['max_per_worker']):
+            return None, self._webhook_shed('worker', 503, limits, 'manifest imports')
+        slot = None
+        if limits['manifest_max_concurrent']:
+            slot = _try_advisory_slot(
+                request.env.cr, MANIFEST_SLOT_LOCK, limits['manifest_max_concurrent'], session=True)
+            if slot is None:
+                _webhook_gate.leave()
+                return None, self._webhook_shed('manifest', 429, limits, 'manifest imports')
+        return slot, None
+
+    def _webhook_shed(self, reason, http_status, limits, what='webhooks'):
+        if _webhook_gate.count_shed(reason):
+            stats = _webhook_gate.snapshot()
+            _logger.warning("3PL: over the %s concurrency limit, shedding %s (%s in flight here, shed so far: %s)",
+                            reason, what, stats['in_flight_worker'], stats['shed'])
+        # Spread the retries so that a burst does not come back all at once
+        retry_after = max(limits['retry_after'], 1)
+        retry_after += random.randint(0, retry_after // 2)
+        return _json_response(
+            {'status': 'error', 'message': f'Too many concurrent {what}, retry later', 'retry_after': retry_after},
+            http_status, headers={'Retry-After': str(retry_after)},
+        )
+
     @http.route('/api/v1/3pl/webhook', type='http', auth='none', methods=['POST'], csrf=False, save_session=False)
     def webhook_3pl_update(self, **kwargs):
         """
@@ -29,256 +248,309 @@ class Logistics3PLController(http.Controller):
         Note: When status is "shipped", the picking is auto-validated if in waiting_3pl state.
         If tracking_url is not provided but tracking_number is, the URL will be 
         constructed using the configured Tracking URL Base + tracking_number.
+        If the picking is locked by a concurrent send or webhook, the update is
+        queued and applied in background; the response is then 202 with
+        "deferred": true. The same happens to auto-validations when the
+        webhook_max_validations slots are all taken.
+
+        Over the webhook_max_per_worker / webhook_max_concurrent limits the
+        request is refused at once, before authentication or any other work,
+        with 503 / 429 and a Retry-After header.
+
+        The response carries a Server-Timing header with the time and SQL
+        queries spent in each phase (auth, parse, lookup, lock, write, chatter,
+        button_validate, ...).
         """
-        _logger.info("3PL Webhook: Received request")
-        
-        # Helper function to return JSON response
-        def json_response(data, status=200):
-            return Response(
-                json.dumps(data),
-                status=status,
-                content_type='application/json'
+        started = time.monotonic()
+        limits = self._webhook_limits()
+        shed_response = self._webhook_admit(limits)
+        if shed_response:
+            return shed_response
+        try:
+            with _3pl_timed(request.env, 'webhook', set_header=False) as timer:
+                response = self._webhook_3pl_update(timer, limits['max_validations'])
+        finally:
+            _webhook_gate.leave()
+        response.headers['Server-Timing'] = timer.server_timing()
+
+        record_traffic = request.env['ir.config_parameter'].sudo().get_param(
+            'logistics_3pl_connector.record_traffic', 'False'
+        ).lower() == 'true'
+        if record_traffic:
+            raw_body = request.httprequest.get_data(as_text=True)
+            try:
+                response_body = json.loads(response.get_data(as_text=True))
+            except ValueError:
+                response_body = response.get_data(as_text=True)
+            try:
+                ref = json.loads(raw_body).get('order_id', '')
+            except (ValueError, AttributeError):
+                ref = ''
+            _record_traffic(
+                'webhook', 'POST', request.httprequest.path, raw_body,
+                response.status_code, response_body,
+                (time.monotonic() - started) * 1000, ref=ref,
             )
-        
+        return response
+
+    def _webhook_3pl_update(self, timer, max_validations=0):
+        """Process a webhook request, see webhook_3pl_update."""
         # 1. Authentication (Token Check)
-        # Use Authorization: Bearer header (same as API calls)
         auth_header = request.httprequest.headers.get('Authorization', '')
-        auth_token = None
-        if auth_header.startswith('Bearer '):
-            auth_token = auth_header[7:]  # Remove 'Bearer ' prefix
-        
-        _logger.info(f"3PL Webhook: Auth token received: {auth_token[:10]}..." if auth_token else "3PL Webhook: No auth token")
-        
-        # Use sudo to access config without user context
-        stored_key = request.env['ir.config_parameter'].sudo().get_param('logistics_3pl_connector.api_key')
-        _logger.info(f"3PL Webhook: Stored key exists: {bool(stored_key)}")
-        
-        if not stored_key:
-            _logger.error("3PL Webhook: API key not configured")
-            return json_response({'status': 'error', 'message': '3PL integration not configured on server'}, 500)
-
-        if auth_token != stored_key:
-            _logger.warning(f"3PL Webhook: Unauthorized - token mismatch")
-            return json_response({'status': 'error', 'message': 'Unauthorized'}, 401)
+        error_response = self._check_api_key('3PL Webhook')
+        if error_response:
+            return error_response
+        _lap('auth')
 
         try:
             # Get JSON data from request body
             try:
                 data = json.loads(request.httprequest.data.decode('utf-8'))
             except (json.JSONDecodeError, UnicodeDecodeError) as e:
-                _logger.error(f"3PL Webhook: Invalid JSON - {e}")
-                return json_response({'status': 'error', 'message': 'Invalid JSON body'}, 400)
+                _logger.error("3PL Webhook: Invalid JSON - %s", e)
+                return _json_response({'status': 'error', 'message': 'Invalid JSON body'}, 400)
             
-            _logger.info(f"3PL Webhook: Received data: {data}")
+            debug_mode = _is_debug_mode(request.env)
+            if debug_mode:
+                _logger.debug("3PL Webhook: Received data: %s", _LazyJSON(data))
             
             if not data:
-                return json_response({'status': 'error', 'message': 'Empty JSON body'}, 400)
-                 
-            order_ref = data.get('order_id')
-            tracking_ref = data.get('tracking_number')
-            tracking_url = data.get('tracking_url')
-            status = data.get('status')
-
-            if not order_ref:
-                return json_response({'status': 'error', 'message': 'Missing order_id'}, 400)
-            
-            # Validate status if provided
-            if status:
-                allowed_statuses = ['shipped', 'delivered', 'completed', 'error']
-                status_lower = status.lower()
-                if status_lower not in allowed_statuses:
-                    _logger.warning(f"3PL Webhook: Invalid status '{status}' for order {order_ref}. Allowed statuses: {allowed_statuses}")
-                    return json_response({
-                        'status': 'error',
-                        'message': f'Invalid status "{status}". Allowed statuses are: {", ".join(allowed_statuses)}'
-                    }, 400)
-
-            # 2. Find the Picking
-            picking = request.env['stock.picking'].sudo().search([('name', '=', order_ref)], limit=1)
-            _logger.info(f"3PL Webhook: Found picking: {picking.name if picking else 'None'}")
-            
-            if not picking:
-                return json_response({'status': 'error', 'message': f'Order {order_ref} not found'}, 404)
-
-            # 2.1. Validate picking state - only allow updates for pickings in valid states
-            allowed_states = ['waiting_3pl', 'assigned']
-            if picking.state not in allowed_states:
-                _logger.warning(f"3PL Webhook: Rejected update for {order_ref} - picking is in state '{picking.state}', allowed states: {allowed_states}")
-                return json_response({
-                    'status': 'error', 
-                    'message': f'Order {order_ref} is in state "{picking.state}". Updates are only allowed for pickings in states: {", ".join(allowed_states)}'
-                }, 400)
-
-            # 3. Update Picking
-            # IMPORTANT: Save the current state BEFORE writing updates
-            # Because changing x_3pl_status will trigger _compute_state and change the state
-            original_state = picking.state
-            should_auto_validate = (
-                status and 
-                status.lower() == 'shipped' and 
-                original_state == 'waiting_3pl'
-            )
-            _logger.info(f"3PL Webhook: {order_ref} - original_state={original_state}, should_auto_validate={should_auto_validate}")
-            
-            vals = {}
-            if tracking_ref:
-                vals['x_3pl_tracking_ref'] = tracking_ref
-                
-                # Build tracking URL if not provided
-                if not tracking_url:
-                    tracking_url_base = request.env['ir.config_parameter'].sudo().get_param(
-                        'logistics_3pl_connector.tracking_url_base', 
-                        default='https://tracking.example.com/odoo/'
-                    )
-                    if tracking_url_base:
-                        # Ensure base URL ends with proper separator
-                        if not tracking_url_base.endswith('/') and not tracking_url_base.endswith('='):
-                            tracking_url_base += '/'
-                        tracking_url = f"{tracking_url_base}{tracking_ref}"
-            
-            if tracking_url:
-                vals['x_3pl_tracking_url'] = tracking_url
-            
-            # Map 3PL status to internal status
-            if status:
-                status_lower = status.lower()
-                if status_lower in ('shipped', 'delivered', 'completed'):
-                    vals['x_3pl_status'] = 'shipped'
-                elif status_lower == 'error':
-                    vals['x_3pl_status'] = 'error'
-            
-            if vals:
-                picking.write(vals)
-                
-                # Use OdooBot or admin user for message_post since auth='none' has no user
-                odoobot = request.env.ref('base.partner_root', raise_if_not_found=False)
-                
-                # Build message with clickable tracking link if URL available
-                status_label = '🚚 Shipped' if status and status.lower() in ('shipped', 'delivered', 'completed') else (status or 'Updated')
-                
-                if tracking_url and tracking_ref:
-                    msg_body = Markup(_("3PL Update: <strong>%s</strong><br/>Tracking: <a href='%s' target='_blank'>%s</a>")) % (status_label, tracking_url, tracking_ref)
-                elif tracking_ref:
-                    msg_body = _("3PL Update: %s - Tracking: %s") % (status_label, tracking_ref)
-                else:
-                    msg_body = _("3PL Update: %s") % status_label
-                
-                picking.with_context(mail_create_nosubscribe=True).message_post(
-                    body=msg_body,
-                    author_id=odoobot.id if odoobot else False,
-                    message_type='notification'
-                )
-            
-            # Auto-validate picking when shipped (if it WAS in waiting_3pl state)
-            # We use should_auto_validate which was determined BEFORE writing updates
-            if should_auto_validate:
-                try:
-                    _logger.info(f"3PL Webhook: Attempting to auto-validate picking {order_ref}")
-                    
-                    # Get user for validation (required because auth='none' has no user context)
-                    # Priority: 1) Configured webhook user, 2) OdooBot as fallback
-                    # Best practice: Configure a dedicated user with only Inventory permissions
-                    webhook_user = None
-                    config_param = request.env['ir.config_parameter'].sudo()
-                    webhook_user_id = config_param.get_param('logistics_3pl_connector.webhook_user_id')
-                    
-                    if webhook_user_id:
-                        try:
-                            webhook_user = request.env['res.users'].sudo().browse(int(webhook_user_id))
-                            if not webhook_user.exists() or not webhook_user.active:
-                                _logger.warning(f"3PL Webhook: Configured webhook user (id={webhook_user_id}) not found or inactive, falling back to OdooBot")
-                                webhook_user = None
-                            else:
-                                _logger.info(f"3PL Webhook: Using configured webhook user: {webhook_user.name} (id={webhook_user.id})")
-                        except (ValueError, TypeError) as e:
-                            _logger.warning(f"3PL Webhook: Invalid webhook_user_id config: {e}, falling back to OdooBot")
-                    
-                    # Fallback to OdooBot if no configured user
-                    if not webhook_user:
-                        # Get OdooBot user (ID=1) as fallback
-                        webhook_user = request.env['res.users'].sudo().browse(1)
-                        if webhook_user.exists():
-                            _logger.info("3PL Webhook: Using OdooBot (fallback). Consider configuring a dedicated webhook user for better security.")
-                        else:
-                            webhook_user = None
-                    
-                    if not webhook_user or not webhook_user.exists():
-                        _logger.error("3PL Webhook: Could not find any user for validation")
-                        raise Exception("No user available for auto-validation")
-                    
-                    # IMPORTANT: Refresh picking from database to get current state after write
-                    # The write() above triggered _compute_state which changed the state
-                    picking = request.env['stock.picking'].with_user(webhook_user).browse(picking.id)
-                    picking.ensure_one()
-                    _logger.info(f"3PL Webhook: Picking {order_ref} current state after refresh: {picking.state}")
-                    
-                    # Call button_validate with context flags to:
-                    # - skip_3pl_check: bypass our 3PL blocking logic
-                    # - skip_3pl_auto_send: prevent recursion
-                    # - skip_sms: skip SMS confirmation wizard
-                    # - skip_backorder: auto-handle backorders without wizard
-                    # - button_validate_picking_ids: required for batch validation
-                    validate_ctx = {
-                        'skip_3pl_check': True,
-                        'skip_3pl_auto_send': True,
-                        'skip_sms': True,
-                        'skip_backorder': True,
-                        'button_validate_picking_ids': picking.ids,
-                    }
-                    
-                    # Validate the picking
-                    _logger.info(f"3PL Webhook: Calling button_validate for {order_ref}")
-                    result = picking.with_context(**validate_ctx).button_validate()
-                    _logger.info(f"3PL Webhook: button_validate returned: {result}")
-                    
-                    # If result is a wizard action, we need to confirm it
-                    if isinstance(result, dict) and result.get('res_model'):
-                        wizard_model = result.get('res_model')
-                        wizard_id = result.get('res_id')
-                        _logger.info(f"3PL Webhook: Wizard returned: {wizard_model} (id={wizard_id}). Attempting to process...")
-                        
-                        # Try to process the wizard automatically
-                        if wizard_id and wizard_model:
-                            # Use with_user() to set webhook user context for wizard processing
-                            wizard = request.env[wizard_model].with_user(webhook_user).browse(wizard_id)
-                            if hasattr(wizard, 'process'):
-                                wizard.with_context(**validate_ctx).process()
-                                _logger.info(f"3PL Webhook: Wizard {wizard_model} processed")
-                            elif hasattr(wizard, 'action_confirm'):
-                                wizard.with_context(**validate_ctx).action_confirm()
-                                _logger.info(f"3PL Webhook: Wizard {wizard_model} confirmed")
-                            elif hasattr(wizard, 'action_done'):
-                                wizard.with_context(**validate_ctx).action_done()
-                                _logger.info(f"3PL Webhook: Wizard {wizard_model} done")
-                    
-                    # Re-read picking to get updated state from database
-                    picking.invalidate_recordset(['state'])
-                    picking = request.env['stock.picking'].with_user(webhook_user).browse(picking.id)
-                    _logger.info(f"3PL Webhook: Auto-validated picking {order_ref}. Final state: {picking.state}")
-                    if picking.state != 'done':
-                        _logger.warning(f"3PL Webhook: Picking {order_ref} validation completed but state is still '{picking.state}', expected 'done'")
-                except Exception as validate_error:
-                    _logger.error(f"3PL Webhook: Could not auto-validate {order_ref}: {validate_error}", exc_info=True)
-
-            _logger.info(f"3PL Webhook: Successfully updated {order_ref} with tracking {tracking_ref}, URL: {tracking_url}")
+                return _json_response({'status': 'error', 'message': 'Empty JSON body'}, 400)
+            if isinstance(data, dict):
+                timer.ref = data.get('order_id') or ''
+            _lap('parse')
+
+            # 2. Apply the update (see stock.picking._3pl_handle_webhook)
+            http_status, body = request.env['stock.picking'].sudo()._3pl_handle_webhook(
+                data, max_validations=max_validations)
+            if http_status == 200:
+                # Drop every cached answer covering the updated deliveries
+                dbname = request.env.cr.dbname
+                refs = request.env['stock.picking'].sudo()._3pl_status_refs(data.get('order_id'))
+                _status_cache.invalidate_many((dbname, ref) for ref in refs)
+            elif body.get('deferred'):
+                _webhook_gate.count_deferred(body.get('reason'))
             
+            _log_sampled(_logger, request.env, "3PL Webhook: %s -> %s %s",
+                         data.get('order_id'), http_status, body.get('status'))
+
             # Debug logging for webhook
-            debug_mode = request.env['ir.config_parameter'].sudo().get_param(
-                'logistics_3pl_connector.debug_mode', 'False'
-            ).lower() == 'true'
-            if debug_mode:
-                _write_debug_log(
+            if debug_mode and http_status in (200, 202):
+                _queue_debug_log(
                     method='WEBHOOK',
                     url='/api/v1/3pl/webhook',
                     headers={'Authorization': auth_header},
                     payload=data,
-                    response_status=200,
-                    response_body={'status': 'success', 'order_id': order_ref, 'tracking_url': tracking_url},
-                    picking_name=order_ref
+                    response_status=http_status,
+                    response_body=body,
+                    picking_name=data.get('order_id')
                 )
             
-            return json_response({'status': 'success', 'order_id': order_ref, 'tracking_url': tracking_url})
+            return _json_response(body, http_status)
 
         except Exception as e:
-            _logger.exception(f"3PL Webhook: Error processing request: {str(e)}")
-            return json_response({'status': 'error', 'message': str(e)}, 500)
\ No newline at end of file
+            _logger.exception("3PL Webhook: Error processing request: %s", e)
+            return _json_response({'status': 'error', 'message': str(e)}, 500)
+
+    @http.route('/api/v1/3pl/status', type='http', auth='none', methods=['GET', 'POST'], csrf=False, save_session=False)
+    def status_3pl(self, **kwargs):
+        """
+        Read-only bulk 3PL status lookup for storefront and customer service tools.
+
+        Expected Headers:
+            Authorization: Bearer <your-api-key>
+
+        Request:
+            POST {"orders": ["WH/OUT/00001", "S00042"]}
+            GET  ?orders=WH/OUT/00001,S00042
+
+        Each reference is a delivery name or a sale order name (the delivery
+        origin); up to STATUS_MAX_REFS per call. The answer only reads stored
+        fields and never calls e-Transport:
+        {
+            "status": "success",
+            "orders": {"S00042": [{"picking": "WH/OUT/00001", "origin": "S00042",
+                                   "state": "waiting_3pl", "status": "sent",
+                                   "current_state": "...", "tracking_ref": "...",
+                                   "tracking_url": "..."}]},
+            "not_found": ["WH/OUT/00001"]
+        }
+
+        Answers are cached per reference and worker for
+        logistics_3pl_connector.status_cache_ttl seconds (default 30, at most
+        STATUS_CACHE_MAX_TTL, 0 disables the cache), see _StatusCache.
+        """
+        error_response = self._check_api_key('3PL Status')
+        if error_response:
+            return error_response
+
+        if request.httprequest.method == 'POST':
+            try:
+                data = json.loads(request.httprequest.data.decode('utf-8') or '{}')
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                return _json_response({'status': 'error', 'message': 'Invalid JSON body'}, 400)
+            refs = data.get('orders') if isinstance(data, dict) else None
+        else:
+            refs = [ref.strip() for ref in (kwargs.get('orders') or '').split(',')]
+
+        if not isinstance(refs, list) or not all(isinstance(ref, str) for ref in refs):
+            return _json_response({'status': 'error', 'message': 'orders must be a list of order references'}, 400)
+        refs = list(dict.fromkeys(ref for ref in refs if ref))
+        if not refs:
+            return _json_response({'status': 'error', 'message': 'Missing orders'}, 400)
+        if len(refs) > STATUS_MAX_REFS:
+            return _json_response({
+                'status': 'error',
+                'message': f'Too many orders: at most {STATUS_MAX_REFS} per call',
+            }, 400)
+
+        try:
+            ttl = min(max(int(request.env['ir.config_parameter'].sudo().get_param(
+                'logistics_3pl_connector.status_cache_ttl', 30) or 0), 0), STATUS_CACHE_MAX_TTL)
+        except (TypeError, ValueError):
+            ttl = 30
+        dbname = request.env.cr.dbname
+        cached = _status_cache.get_many([(dbname, ref) for ref in refs]) if ttl else {}
+        orders = {ref: cached[(dbname, ref)] for ref in refs if (dbname, ref) in cached}
+
+        missing = [ref for ref in refs if ref not in orders]
+        if missing:
+            found = request.env['stock.picking'].sudo()._3pl_status_lookup(missing)
+            orders.update(found)
+            if ttl:
+                _status_cache.set_many({(dbname, ref): entries for ref, entries in found.items()}, ttl)
+
+        _log_sampled(_logger, request.env, "3PL Status: %s refs, %s from cache", len(refs), len(cached))
+        return _json_response({
+            'status': 'success',
+            'orders': {ref: orders[ref] for ref in refs if orders[ref]},
+            'not_found': [ref for ref in refs if not orders[ref]],
+        }, headers={'Cache-Control': f'private, max-age={ttl}' if ttl else 'no-store'})
+
+    @http.route('/api/v1/3pl/manifest', type='http', auth='none', methods=['POST'], csrf=False, save_session=False)
+    def manifest_3pl_import(self, **kwargs):
+        """
+        Bulk status import for e-Transport end-of-day manifests.
+
+        Expected Headers:
+            Authorization: Bearer <your-api-key>
+            Content-Type: text/csv or application/x-ndjson
+
+        The body is the raw manifest: CSV with a header row or JSON Lines, with
+        the webhook fields (order_id or tms_id, status, tracking_number,
+        tracking_url). ``?format=csv|jsonl`` overrides the Content-Type.
+
+        The body is parsed while it is read and applied in batches, see
+        stock.picking._3pl_import_manifest. The answer gives the count per
+        result and the lines that were not applied (first MANIFEST_MAX_ISSUES):
+        {"status": "success", "lines": 1200, "results": {"updated": 1180, ...},
+         "issues": [{"line": 12, "order": "WH/OUT/00012", "result": "error", "message": "..."}]}
+
+        Each batch is committed before its lines are counted: on a 500 answer,
+        "lines" and "results" give what was applied before the failing batch.
+
+        Like webhooks, the request is refused at once over the
+        webhook_max_per_worker / manifest_max_concurrent limits, with 503 / 429
+        and a Retry-After header.
+        """
+        limits = self._webhook_limits()
+        slot, shed_response = self._manifest_admit(limits)
+        if shed_response:
+            return shed_response
+        try:
+            return self._manifest_3pl_import(**kwargs)
+        finally:
+            if slot is not None:
+                _release_advisory_slot(request.env.cr, MANIFEST_SLOT_LOCK, slot)
+            _webhook_gate.leave()
+
+    def _manifest_3pl_import(self, **kwargs):
+        """Process a manifest import request, see manifest_3pl_import."""
+        error_response = self._check_api_key('3PL Manifest')
+        if error_response:
+            return error_response
+
+        file_format = kwargs.get('format') or (
+            'jsonl' if 'json' in (request.httprequest.mimetype or '') else 'csv')
+        if file_format not in ('csv', 'jsonl'):
+            return _json_response({'status': 'error', 'message': 'format must be csv or jsonl'}, 400)
+
+        issues = []
+        counts = collections.Counter()
+
+        def report(line_no, ref, result, message):
+            counts[result] += 1
+            if result not in ('updated', 'validated') and len(issues) < MANIFEST_MAX_ISSUES:
+                issues.append({'line': line_no, 'order': ref, 'result': result, 'message': message})
+
+        try:
+            text = io.TextIOWrapper(request.httprequest.stream, encoding='utf-8-sig', errors='replace', newline='')
+            request.env['stock.picking'].sudo()._3pl_import_manifest(
+                _iter_manifest_rows(text, file_format), report)
+        except Exception as e:
+            # Only the failing batch is rolled back, the previous ones are committed
+            request.env.cr.rollback()
+            _logger.exception("3PL Manifest: Error processing manifest after %s lines: %s", sum(counts.values()), e)
+            return _json_response({
+                'status': 'error',
+                'message': str(e),
+                'lines': sum(counts.values()),
+                'results': dict(counts),
+                'issues': issues,
+            }, 500)
+
+        _logger.info("3PL Manifest: %s lines imported: %s", sum(counts.values()), dict(counts))
+        return _json_response({
+            'status': 'success',
+            'lines': sum(counts.values()),
+            'results': dict(counts),
+            'issues': issues,
+        })
+
+    @http.route('/api/v1/3pl/queue', type='http', auth='none', methods=['GET'], csrf=False, save_session=False)
+    def queue_3pl_stats(self, **kwargs):
+        """
+        Monitoring of the background send queue, per priority lane, and of
+        the webhook load shedding.
+
+        Expected Headers:
+            Authorization: Bearer <your-api-key>
+
+        Answer (waits in seconds, see stock.picking._3pl_lane_stats):
+        {"status": "success",
+         "lanes": {"urgent": {"depth": 3, "oldest_wait_s": 4, "sent_last_hour": 120,
+                              "avg_wait_s": 2.1, "max_wait_s": 9.8}, "normal": {...}, "bulk": {...}},
+         "open_waves": 2,
+         "webhook": {"in_flight": 3, "validations_in_flight": 1, "manifests_in_flight": 0, "pending_events": 12,
+                     "in_flight_worker": 1, "shed": {"database": 40}, "deferred": {"busy": 8},
+                     "worker_pid": 1234, "limits": {...}}}
+
+        in_flight, validations_in_flight and manifests_in_flight count the slots held across all
+        workers (null without the matching limit); in_flight_worker, shed and
+        deferred are counters of the worker that answers, since it started.
+        """
+        error_response = self._check_api_key('3PL Queue')
+        if error_response:
+            return error_response
+
+        cr = request.env.cr
+        limits = self._webhook_limits()
+        webhook = {
+            'in_flight': _advisory_slots_in_use(cr, WEBHOOK_SLOT_LOCK) if limits['max_concurrent'] else None,
+            'validations_in_flight': (
+                _advisory_slots_in_use(cr, WEBHOOK_VALIDATION_SLOT_LOCK) if limits['max_validations'] else None
+            ),
+            'manifests_in_flight': (
+                _advisory_slots_in_use(cr, MANIFEST_SLOT_LOCK) if limits['manifest_max_concurrent'] else None
+            ),
+            'pending_events': request.env['logistics.3pl.event'].sudo().search_count([('state', '=', 'pending')]),
+            **_webhook_gate.snapshot(),
+            'worker_pid': os.getpid(),
+            'limits': limits,
+        }
+        return _json_response({
+            'status': 'success',
+            'lanes': request.env['stock.picking'].sudo()._3pl_lane_stats(),
+            'open_waves': request.env['logistics.3pl.send.batch'].sudo().search_count([('state', '=', 'open')]),
+            'webhook': webhook,
+        }, headers={'Cache-Control': 'no-store'})
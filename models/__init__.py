@@ -1,3 +1,8 @@
 from . import res_config_settings
+from . import res_partner
+from . import product_template
+from . import product_product
 from . import stock_picking
-
+from . import stock_move
+from . import logistics_3pl_send_batch
+from . import logistics_3pl_event
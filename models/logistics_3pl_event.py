@@ -0,0 +1,104 @@
+import logging
+from datetime import timedelta
+from odoo import models, fields, api
+
+_logger = logging.getLogger(__name__)
+
+
+class Logistics3PLEvent(models.Model):
+    """
+    3PL status update waiting to be applied.
+
+    Webhooks for a picking that is locked by a concurrent send or webhook, and
+    auto-validations over the webhook's concurrency limit, are stored here
+    instead of blocking the HTTP worker. The event cron applies
+    them in arrival order per picking, backing off while the lock is held.
+    """
+    _name = 'logistics.3pl.event'
+    _description = "e-Transport Deferred Event"
+    _order = 'id'
+    _rec_name = 'order_ref'
+
+    order_ref = fields.Char(string="Order Reference", required=True, readonly=True, index=True)
+    payload = fields.Json(string="Payload", readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string="Status", default='pending', required=True, readonly=True, index=True)
+    attempts = fields.Integer(readonly=True)
+    next_attempt_at = fields.Datetime(string="Next Attempt", readonly=True, index=True,
+        default=fields.Datetime.now)
+    http_status = fields.Integer(string="Result Code", readonly=True)
+    result = fields.Char(readonly=True)
+
+    @api.model
+    def _has_pending(self, order_ref):
+        return bool(self.search_count([('order_ref', '=', order_ref), ('state', '=', 'pending')], limit=1))
+
+    @api.model
+    def _defer(self, order_ref, data, delay=2, reason='locked'):
+        """
+        Queue a webhook payload for background processing and build the 202 answer.
+
+        ``reason`` is 'locked' (the picking is locked by another operation) or
+        'busy' (all the auto-validation slots are taken).
+        """
+        self.create({
+            'order_ref': order_ref,
+            'payload': data,
+            'next_attempt_at': fields.Datetime.now() + timedelta(seconds=delay),
+        })
+        self.env.ref('logistics_3pl_connector.ir_cron_3pl_process_events')._trigger(
+            fields.Datetime.now() + timedelta(seconds=delay))
+        if reason == 'busy':
+            _logger.info("3PL Webhook: %s - auto-validation slots busy, update deferred", order_ref)
+        else:
+            _logger.info("3PL Webhook: %s is locked by another operation, update deferred", order_ref)
+        return 202, {'status': 'accepted', 'order_id': order_ref, 'deferred': True, 'reason': reason}
+
+    @api.model
+    def _cron_process_events(self, limit=500):
+        config = self.env['ir.config_parameter'].sudo()
+        max_attempts = int(config.get_param('logistics_3pl_connector.event_max_attempts', 10) or 10)
+        now = fields.Datetime.now()
+
+        # Refs with an older event still backing off must keep their order
+        blocked = set(self.search([
+            ('state', '=', 'pending'), ('next_attempt_at', '>', now),
+        ]).mapped('order_ref'))
+
+        Picking = self.env['stock.picking'].sudo()
+        for event in self.search([('state', '=', 'pending'), ('next_attempt_at', '<=', now)], limit=limit):
+            if event.order_ref in blocked:
+                continue
+            try:
+                http_status, body = Picking._3pl_handle_webhook(event.payload or {}, defer_on_conflict=False)
+            except Exception as e:
+                self.env.cr.rollback()
+                _logger.exception("3PL event %s for %s failed", event.id, event.order_ref)
+                http_status, body = 500, {'message': str(e)}
+
+            if http_status == 409:
+                attempts = event.attempts + 1
+                event.write({
+                    'attempts': attempts,
+                    'state': 'pending' if attempts < max_attempts else 'failed',
+                    'next_attempt_at': fields.Datetime.now() + timedelta(seconds=min(2 ** attempts, 300)),
+                    'http_status': http_status,
+                    'result': body.get('message'),
+                })
+                blocked.add(event.order_ref)
+            else:
+                event.write({
+                    'state': 'done' if http_status < 400 else 'failed',
+                    'attempts': event.attempts + 1,
+                    'http_status': http_status,
+                    'result': body.get('message') or body.get('status'),
+                })
+            self.env.cr.commit()
+
+        next_event = self.search([('state', '=', 'pending')], order='next_attempt_at', limit=1)
+        if next_event:
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_process_events')._trigger(
+                max(next_event.next_attempt_at, fields.Datetime.now()))
@@ -0,0 +1,305 @@
+import logging
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from odoo import models, fields, api, _
+from odoo.tools import split_every
+from .stock_picking import WAVE_OPEN_LOCK
+
+_logger = logging.getLogger(__name__)
+
+
+class Logistics3PLSendBatch(models.Model):
+    """
+    Deliveries sent to e-Transport in background, in chunks of import calls.
+
+    Batches come from a mass send of a list selection, or are waves: with
+    wave mode, deliveries auto-sent on validation are collected per warehouse
+    and ServiceType and the wave is released at the next cutoff time, or as
+    soon as it reaches the size threshold.
+    """
+    _name = 'logistics.3pl.send.batch'
+    _description = "e-Transport Send Batch"
+    _order = 'id desc'
+
+    name = fields.Char(string="Reference", required=True, readonly=True, copy=False,
+        default=lambda self: _("New"))
+    state = fields.Selection([
+        ('open', 'Collecting'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+    ], string="Status", default='queued', required=True, readonly=True, copy=False)
+    user_id = fields.Many2one('res.users', string="Requested by", readonly=True,
+        default=lambda self: self.env.user)
+    picking_ids = fields.One2many('stock.picking', 'x_3pl_batch_id', string="Deliveries", readonly=True)
+    date_start = fields.Datetime(string="Started", readonly=True, copy=False)
+    date_done = fields.Datetime(string="Finished", readonly=True, copy=False)
+
+    kind = fields.Selection([
+        ('manual', 'Mass Send'),
+        ('wave', 'Wave'),
+    ], string="Type", default='manual', required=True, readonly=True)
+    warehouse_id = fields.Many2one('stock.warehouse', string="Warehouse", readonly=True)
+    service_type = fields.Char(string="ServiceType", readonly=True)
+    cutoff_at = fields.Datetime(string="Cutoff", readonly=True, copy=False,
+        help="When this wave is released if it does not reach the size threshold first")
+    flush_reason = fields.Selection([
+        ('cutoff', 'Cutoff'),
+        ('size', 'Size Threshold'),
+        ('manual', 'Manual'),
+    ], string="Released By", readonly=True, copy=False)
+    date_flushed = fields.Datetime(string="Released", readonly=True, copy=False)
+    flush_latency = fields.Float(string="Flush Latency (s)", readonly=True, copy=False, aggregator='avg',
+        help="Time between the wave opening (first delivery collected) and its release")
+
+    picking_count = fields.Integer(compute='_compute_progress', string="Deliveries")
+    queued_count = fields.Integer(compute='_compute_progress', string="Queued")
+    sent_count = fields.Integer(compute='_compute_progress', string="Sent")
+    failed_count = fields.Integer(compute='_compute_progress', string="Failed")
+    progress = fields.Float(compute='_compute_progress', string="Progress")
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', _("New")) == _("New"):
+                vals['name'] = self.env['ir.sequence'].next_by_code('logistics.3pl.send.batch') or _("New")
+        return super().create(vals_list)
+
+    @api.depends('picking_ids.x_3pl_queue_state')
+    def _compute_progress(self):
+        """Count deliveries per queue state with a single grouped query."""
+        counts = {}
+        if self.ids:
+            groups = self.env['stock.picking']._read_group(
+                [('x_3pl_batch_id', 'in', self.ids)],
+                groupby=['x_3pl_batch_id', 'x_3pl_queue_state'],
+                aggregates=['__count'],
+            )
+            for batch, queue_state, count in groups:
+                counts[(batch.id, queue_state)] = count
+
+        for batch in self:
+            queued = counts.get((batch.id, 'queued'), 0)
+            sent = counts.get((batch.id, 'sent'), 0)
+            failed = counts.get((batch.id, 'failed'), 0)
+            total = queued + sent + failed
+            batch.queued_count = queued
+            batch.sent_count = sent
+            batch.failed_count = failed
+            batch.picking_count = total
+            batch.progress = 100.0 * (sent + failed) / total if total else 0.0
+
+    def action_view_pickings(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': self.name,
+            'res_model': 'stock.picking',
+            'view_mode': 'list,form',
+            'domain': [('x_3pl_batch_id', '=', self.id)],
+            'context': {'create': False},
+        }
+
+    def action_flush_wave(self):
+        """Release the wave now instead of waiting for its cutoff."""
+        self.filtered(lambda b: b.state == 'open')._wave_flush('manual')
+        return True
+
+    @api.model
+    def _wave_next_cutoff(self):
+        """
+        Naive UTC datetime of the next wave cutoff.
+
+        Cutoffs are local times (company timezone) like "09:00,13:30,17:00";
+        without them a wave is released Maximum Wave Wait minutes after opening.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        now = fields.Datetime.now()
+        cutoffs = []
+        for value in (config.get_param('logistics_3pl_connector.wave_cutoffs') or '').split(','):
+            match = re.fullmatch(r'\s*(\d{1,2}):(\d{2})\s*', value)
+            if match and int(match[1]) < 24 and int(match[2]) < 60:
+                cutoffs.append((int(match[1]), int(match[2])))
+        if not cutoffs:
+            max_wait = int(config.get_param('logistics_3pl_connector.wave_max_wait', 15) or 15)
+            return now + timedelta(minutes=max_wait)
+
+        tz_name = self.env.company.partner_id.tz or self.env.user.tz or 'UTC'
+        try:
+            tz = ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            tz = timezone.utc
+        local_now = now.replace(tzinfo=timezone.utc).astimezone(tz)
+        candidates = [
+            datetime.combine(local_now.date() + timedelta(days=day), datetime.min.time(), tz).replace(
+                hour=hour, minute=minute)
+            for day in (0, 1) for hour, minute in cutoffs
+        ]
+        cutoff = min(candidate for candidate in candidates if candidate > local_now)
+        return cutoff.astimezone(timezone.utc).replace(tzinfo=None)
+
+    @api.model
+    def _wave_enqueue(self, pickings):
+        """
+        Add deliveries to the open wave of their warehouse and ServiceType (opening one if needed).
+
+        Concurrent validations look the wave up under a transaction-level
+        advisory lock per warehouse and ServiceType, held until they commit.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        max_size = int(config.get_param('logistics_3pl_connector.wave_max_size', 200) or 0)
+        cron = self.env.ref('logistics_3pl_connector.ir_cron_3pl_flush_waves')
+
+        groups = {}
+        for picking in pickings:
+            key = (picking.picking_type_id.warehouse_id.id, picking._get_etransport_service_type())
+            groups.setdefault(key, self.env['stock.picking'])
+            groups[key] |= picking
+
+        waves = self.browse()
+        for (warehouse_id, service_type), group in groups.items():
+            self.env.cr.execute("SELECT pg_advisory_xact_lock(%s, hashtext(%s))",
+                                [WAVE_OPEN_LOCK, f"{warehouse_id or 0}/{service_type or ''}"])
+            wave = self.search([
+                ('kind', '=', 'wave'), ('state', '=', 'open'),
+                ('warehouse_id', '=', warehouse_id), ('service_type', '=', service_type),
+            ], order='id', limit=1)
+            if not wave:
+                wave = self.create({
+                    'kind': 'wave',
+                    'state': 'open',
+                    'warehouse_id': warehouse_id,
+                    'service_type': service_type,
+                    'cutoff_at': self._wave_next_cutoff(),
+                })
+                cron._trigger(wave.cutoff_at)
+            group._3pl_enqueue(wave)
+            body = _("⏳ Queued for e-Transport in wave %s (cutoff %s).") % (
+                wave.name, fields.Datetime.context_timestamp(self, wave.cutoff_at).strftime('%Y-%m-%d %H:%M'))
+            group._3pl_message_log_batch(bodies=dict.fromkeys(group.ids, body))
+            if max_size and wave.queued_count >= max_size:
+                wave._wave_flush('size')
+            waves |= wave
+        return waves
+
+    def _wave_flush(self, reason):
+        """Release open waves to the batch sender."""
+        # A validation whose snapshot predates the commit of a newly opened
+        # wave cannot see it and opens its own: release such twins together
+        keys = {(wave.warehouse_id.id, wave.service_type) for wave in self}
+        twins = self.search([
+            ('kind', '=', 'wave'), ('state', '=', 'open'), ('id', 'not in', self.ids),
+            ('warehouse_id', 'in', [key[0] for key in keys]),
+        ]).filtered(lambda w: (w.warehouse_id.id, w.service_type) in keys) if keys else self.browse()
+        now = fields.Datetime.now()
+        for wave in self | twins:
+            wave.write({
+                'state': 'queued',
+                'flush_reason': reason,
+                'date_flushed': now,
+                'flush_latency': (now - wave.create_date).total_seconds(),
+            })
+            _logger.info("e-Transport wave %s released (%s): %s deliveries after %.0f s",
+                         wave.name, reason, wave.queued_count, wave.flush_latency)
+        if self:
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_send_batches')._trigger()
+
+    @api.model
+    def _cron_flush_waves(self):
+        """Release the waves whose cutoff has passed and schedule the next check."""
+        due = self.search([('kind', '=', 'wave'), ('state', '=', 'open'), ('cutoff_at', '<=', fields.Datetime.now())])
+        due._wave_flush('cutoff')
+        next_wave = self.search([('kind', '=', 'wave'), ('state', '=', 'open')], order='cutoff_at', limit=1)
+        if next_wave:
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_flush_waves')._trigger(next_wave.cutoff_at)
+
+    def action_retry_failed(self):
+        """Re-queue the failed deliveries of this batch and wake up the sender."""
+        failed = self.env['stock.picking'].search([
+            ('x_3pl_batch_id', 'in', self.ids),
+            ('x_3pl_queue_state', '=', 'failed'),
+            ('state', '=', 'assigned'),
+        ])
+        if failed:
+            for batch in failed.x_3pl_batch_id:
+                failed.filtered(lambda p: p.x_3pl_batch_id == batch)._3pl_enqueue(batch)
+            self.write({'state': 'queued', 'date_done': False})
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_send_batches')._trigger()
+        return True
+
+    @api.model
+    def _cron_process_batches(self):
+        """
+        Drain queued send batches.
+
+        Each round takes up to ``chunk_size * workers`` queued deliveries across
+        all released batches, by priority lane (see
+        stock.picking._3pl_next_to_send): urgent deliveries preempt bulk ones
+        queued earlier, and deliveries waiting too long are served first
+        whatever their lane. They are grouped in chunks of ``chunk_size``
+        orders (one /tms/import-data call per chunk) and the chunks are posted
+        concurrently. Results are committed after every round so progress is
+        visible while the batches are still running.
+
+        With consolidation enabled, the deliveries sharing an e-Transport order
+        (see stock.picking._3pl_consolidation_groups) are queued in the same
+        lane and taken in the same round, so they land in the same chunk.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        chunk_size = max(int(config.get_param('logistics_3pl_connector.batch_chunk_size', 50) or 50), 1)
+        workers = max(int(config.get_param('logistics_3pl_connector.batch_workers', 4) or 4), 1)
+        time_budget = int(config.get_param('logistics_3pl_connector.batch_time_budget', 240) or 240)
+        started = time.monotonic()
+
+        Picking = self.env['stock.picking']
+        cron = self.env.ref('logistics_3pl_connector.ir_cron_3pl_send_batches')
+        queued = self.search([('state', '=', 'queued')])
+        if queued:
+            queued.write({'state': 'running', 'date_start': fields.Datetime.now()})
+            self.env.cr.commit()
+
+        while True:
+            pickings = Picking._3pl_next_to_send(chunk_size * workers)
+            if not pickings:
+                break
+
+            # Leave deliveries a webhook or manual send is working on for a later run
+            locked = pickings._3pl_lock_available()
+            if not locked:
+                cron._trigger(fields.Datetime.now() + timedelta(seconds=30))
+                break
+            pickings = locked
+
+            # Deliveries sent manually or moved on since they were queued
+            stale = pickings.filtered(lambda p: p.state != 'assigned' or p.x_3pl_status not in ('draft', 'error'))
+            if stale:
+                already_sent = stale.filtered(lambda p: p.x_3pl_status == 'sent')
+                already_sent.write({'x_3pl_queue_state': 'sent'})
+                (stale - already_sent).write({'x_3pl_queue_state': 'failed'})
+                pickings -= stale
+                if not pickings:
+                    continue
+
+            groups = pickings._3pl_consolidation_groups()
+            chunks = [Picking.concat(*chunk) for chunk in split_every(chunk_size, groups)]
+            Picking._3pl_send_chunks(chunks, max_workers=workers)
+            self.env.cr.commit()
+            if _logger.isEnabledFor(logging.DEBUG):
+                _logger.debug("e-Transport send round, lanes: %s", Picking._3pl_lane_stats())
+
+            if time.monotonic() - started > time_budget:
+                _logger.info("e-Transport batches: time budget exhausted, rescheduling")
+                cron._trigger()
+                break
+
+        for batch in self.search([('state', '=', 'running')], order='id'):
+            if batch.queued_count:
+                continue
+            batch.write({'state': 'done', 'date_done': fields.Datetime.now()})
+            _logger.info(
+                "e-Transport batch %s done: %s sent, %s failed",
+                batch.name, batch.sent_count, batch.failed_count,
+            )
+            self.env.cr.commit()
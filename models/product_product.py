@@ -0,0 +1,41 @@
+from odoo import fields, models, api
+
+
+class ProductProduct(models.Model):
+    _inherit = 'product.product'
+
+    # Precomputed e-Transport goods descriptor: building a payload only has to
+    # multiply these by the move quantity instead of re-deriving them per send.
+    x_etransport_packs_type_id = fields.Char(
+        string="e-Transport PacksTypeID", compute='_compute_etransport_descriptor', store=True)
+    x_etransport_description = fields.Char(
+        string="e-Transport Description", compute='_compute_etransport_descriptor', store=True)
+    x_etransport_unit_weight = fields.Float(
+        string="e-Transport Unit Weight", compute='_compute_etransport_descriptor', store=True,
+        digits='Stock Weight')
+    x_etransport_unit_volume = fields.Float(
+        string="e-Transport Unit Volume", compute='_compute_etransport_descriptor', store=True,
+        digits='Volume')
+    x_etransport_temperature = fields.Selection(
+        related='product_tmpl_id.x_etransport_temperature', store=True)
+
+    @staticmethod
+    def _etransport_packs_type_id_from_name(name):
+        """Derive a PacksTypeID from a product name when there is no internal reference."""
+        name = (name or 'generic').lower()
+        if '-' in name:
+            # Has hyphen: just remove spaces
+            return name.replace(' ', '')
+        # No hyphen: replace spaces with hyphens
+        # Use split/join to handle multiple spaces
+        return '-'.join(name.split())
+
+    @api.depends('default_code', 'name', 'weight', 'volume')
+    def _compute_etransport_descriptor(self):
+        for product in self:
+            product.x_etransport_packs_type_id = (
+                product.default_code or self._etransport_packs_type_id_from_name(product.name)
+            )
+            product.x_etransport_description = product.name
+            product.x_etransport_unit_weight = product.weight or 0.0
+            product.x_etransport_unit_volume = product.volume or 0.0
@@ -0,0 +1,13 @@
+from odoo import fields, models
+
+
+class ProductTemplate(models.Model):
+    _inherit = 'product.template'
+
+    x_etransport_temperature = fields.Selection([
+        ('AM', 'Ambiente'),
+        ('FR', 'Frío'),
+        ('CO', 'Congelado'),
+    ], string="e-Transport Temperature",
+        help="Temperature class sent to e-Transport for this product. "
+             "If empty, the Default Temperature from Inventory Settings is used.")
@@ -43,6 +43,17 @@ class ResConfigSettings(models.TransientModel):
         default='FR',
         help="Default temperature for goods (AM=Ambiente, FR=Frío, CO=Congelado)"
     )
+    logistics_3pl_known_shipment_types = fields.Char(
+        string="Known ShipmentTypes",
+        config_parameter='logistics_3pl_connector.known_shipment_types',
+        help="Comma-separated ShipmentType codes configured in e-Transport. Orders with another code fail "
+             "the pre-flight check instead of being rejected by e-Transport. Empty: not checked."
+    )
+    logistics_3pl_known_service_types = fields.Char(
+        string="Known ServiceTypes",
+        config_parameter='logistics_3pl_connector.known_service_types',
+        help="Comma-separated ServiceType codes configured in e-Transport. Empty: not checked."
+    )
     
     # === Automation Settings ===
     logistics_3pl_auto_send = fields.Boolean(
@@ -65,6 +76,79 @@ class ResConfigSettings(models.TransientModel):
              "Useful for testing or when an order needs to be re-transmitted. "
              "Use with caution in production as it may create duplicate orders in the 3PL system."
     )
+    logistics_3pl_wave_mode = fields.Boolean(
+        string="Send in Waves",
+        config_parameter='logistics_3pl_connector.wave_mode',
+        default=False,
+        help="Auto-send collects validated deliveries per warehouse and ServiceType and sends them in one background "
+             "batch at the next cutoff (or when the wave is full). Starred (urgent) deliveries are still sent at once."
+    )
+    logistics_3pl_wave_cutoffs = fields.Char(
+        string="Wave Cutoffs",
+        config_parameter='logistics_3pl_connector.wave_cutoffs',
+        help="Local times waves are released at, comma-separated (e.g. 09:00,13:00,17:30)."
+    )
+    logistics_3pl_wave_max_wait = fields.Integer(
+        string="Maximum Wave Wait (min)",
+        config_parameter='logistics_3pl_connector.wave_max_wait',
+        default=15,
+        help="Without cutoffs, a wave is released this many minutes after its first delivery."
+    )
+    logistics_3pl_wave_max_size = fields.Integer(
+        string="Wave Size Threshold",
+        config_parameter='logistics_3pl_connector.wave_max_size',
+        default=200,
+        help="A wave is released before its cutoff as soon as it holds this many deliveries. 0: no limit."
+    )
+    logistics_3pl_push_updates = fields.Boolean(
+        string="Push Changes of Sent Orders",
+        config_parameter='logistics_3pl_connector.push_updates',
+        default=False,
+        help="When the goods, address, delivery date or time slot of a delivery already sent to e-Transport change, "
+             "or the delivery is cancelled, update the order in e-Transport automatically (upsert by ExternalRef)."
+    )
+    logistics_3pl_update_debounce = fields.Integer(
+        string="Update Delay (s)",
+        config_parameter='logistics_3pl_connector.update_debounce',
+        default=60,
+        help="Changes made within this many seconds of the first one are sent together as a single update."
+    )
+    logistics_3pl_batch_chunk_size = fields.Integer(
+        string="Batch Chunk Size",
+        config_parameter='logistics_3pl_connector.batch_chunk_size',
+        default=50,
+        help="Number of orders sent in each /tms/import-data call when sending a selection in background."
+    )
+    logistics_3pl_batch_workers = fields.Integer(
+        string="Parallel Batch Calls",
+        config_parameter='logistics_3pl_connector.batch_workers',
+        default=4,
+        help="Maximum number of import calls sent to e-Transport at the same time by the background sender."
+    )
+    logistics_3pl_urgent_service_types = fields.Char(
+        string="Urgent ServiceTypes",
+        config_parameter='logistics_3pl_connector.urgent_service_types',
+        help="Comma-separated ServiceTypes always sent first by the background sender (e.g. ND_3H)."
+    )
+    logistics_3pl_urgent_window_hours = fields.Float(
+        string="Urgent Window (h)",
+        config_parameter='logistics_3pl_connector.urgent_window_hours',
+        default=4.0,
+        help="Deliveries whose delivery window starts within this many hours are sent first."
+    )
+    logistics_3pl_lane_max_wait = fields.Integer(
+        string="Lane Max Wait (min)",
+        config_parameter='logistics_3pl_connector.lane_max_wait',
+        default=15,
+        help="Queued deliveries waiting longer than this are sent before any newer work, whatever their priority."
+    )
+    logistics_3pl_consolidate = fields.Boolean(
+        string="Consolidate Deliveries",
+        config_parameter='logistics_3pl_connector.consolidate',
+        default=False,
+        help="In background sends, deliveries of the same customer, address, date and time slot are sent "
+             "as a single e-Transport order with merged goods."
+    )
     
     # === Debug Settings ===
     logistics_3pl_debug_mode = fields.Boolean(
@@ -74,7 +158,113 @@ class ResConfigSettings(models.TransientModel):
         help="If enabled, all API requests and responses will be logged to a file. "
              "File location: /var/log/odoo/3pl_debug.log or /tmp/3pl_debug.log"
     )
+    logistics_3pl_record_traffic = fields.Boolean(
+        string="Record Traffic",
+        config_parameter='logistics_3pl_connector.record_traffic',
+        default=False,
+        help="If enabled, inbound webhooks and outbound e-Transport calls are appended to a replayable "
+             "JSON Lines file: /var/log/odoo/3pl_traffic.jsonl or /tmp/3pl_traffic.jsonl. "
+             "Replay it with scripts/replay_3pl_traffic.py."
+    )
+    logistics_3pl_log_sample_rate = fields.Float(
+        string="Log Sample Rate",
+        config_parameter='logistics_3pl_connector.log_sample_rate',
+        default=1.0,
+        help="Share of successful sends and webhooks summarised in the server log at INFO level "
+             "(1 = all, 0.1 = one in ten). Warnings and errors are always logged."
+    )
+    logistics_3pl_profile_threshold_ms = fields.Integer(
+        string="Slow Request Threshold (ms)",
+        config_parameter='logistics_3pl_connector.profile_threshold_ms',
+        default=0,
+        help="Sends, tracking fetches and webhooks slower than this are saved with their per-phase timings "
+             "and SQL query counts to /var/log/odoo/3pl_profiles or /tmp/3pl_profiles. 0 disables it."
+    )
+    logistics_3pl_profile_sample_rate = fields.Float(
+        string="Profiler Sample Rate",
+        config_parameter='logistics_3pl_connector.profile_sample_rate',
+        default=0.1,
+        help="Share of requests run under cProfile while the slow request threshold is set. "
+             "Profiles of slow requests are saved next to their timings (.prof, readable with pstats/snakeviz)."
+    )
+    
+    # === Retention Settings ===
+    logistics_3pl_retention_message_days = fields.Integer(
+        string="Keep Chatter Notes (days)",
+        config_parameter='logistics_3pl_connector.retention_message_days',
+        default=0,
+        help="e-Transport notes older than this are removed from the deliveries' chatter by the retention cron. "
+             "0 keeps them forever."
+    )
+    logistics_3pl_retention_message_mode = fields.Selection([
+        ('compact', 'Compact into one summary note'),
+        ('delete', 'Delete'),
+    ], string="Old Chatter Notes",
+        config_parameter='logistics_3pl_connector.retention_message_mode',
+        default='compact',
+        help="Compact: old notes of a delivery are replaced by a single note listing them. Delete: they are removed."
+    )
+    logistics_3pl_retention_event_days = fields.Integer(
+        string="Keep Deferred Events (days)",
+        config_parameter='logistics_3pl_connector.retention_event_days',
+        default=30,
+        help="Applied or failed deferred webhook events older than this are deleted. 0 keeps them forever."
+    )
+    logistics_3pl_log_max_mb = fields.Integer(
+        string="Max Log Size (MB)",
+        config_parameter='logistics_3pl_connector.log_max_mb',
+        default=50,
+        help="Debug log and traffic capture files larger than this are rotated by the retention cron. 0 disables rotation."
+    )
+    logistics_3pl_log_backups = fields.Integer(
+        string="Rotated Logs Kept",
+        config_parameter='logistics_3pl_connector.log_backups',
+        default=5,
+        help="Number of rotated debug log / traffic capture files kept (.1 is the most recent)."
+    )
+    logistics_3pl_retention_profile_days = fields.Integer(
+        string="Keep Slow Request Profiles (days)",
+        config_parameter='logistics_3pl_connector.retention_profile_days',
+        default=14,
+        help="Slow request captures older than this are deleted. 0 keeps them forever."
+    )
     
+    # === Webhook Settings ===
+    logistics_3pl_webhook_max_concurrent = fields.Integer(
+        string="Max Concurrent Webhooks",
+        config_parameter='logistics_3pl_connector.webhook_max_concurrent',
+        default=0,
+        help="Webhooks processed at the same time across all Odoo workers. Extra requests get 429 "
+             "with Retry-After. 0 = no limit."
+    )
+    logistics_3pl_webhook_max_per_worker = fields.Integer(
+        string="Max Webhooks per Worker",
+        config_parameter='logistics_3pl_connector.webhook_max_per_worker',
+        default=0,
+        help="Webhooks processed at the same time by one Odoo process (threaded servers). Extra requests "
+             "get 503 with Retry-After. 0 = no limit."
+    )
+    logistics_3pl_webhook_max_validations = fields.Integer(
+        string="Max Webhook Validations",
+        config_parameter='logistics_3pl_connector.webhook_max_validations',
+        default=0,
+        help="Auto-validations run by webhooks at the same time across all workers. Webhooks over the "
+             "limit are queued and validated in background (202). 0 = no limit."
+    )
+    logistics_3pl_webhook_retry_after = fields.Integer(
+        string="Webhook Retry-After (s)",
+        config_parameter='logistics_3pl_connector.webhook_retry_after',
+        default=5,
+        help="Seconds the 3PL is asked to wait before retrying a refused webhook."
+    )
+    logistics_3pl_manifest_max_concurrent = fields.Integer(
+        string="Max Concurrent Manifest Imports",
+        config_parameter='logistics_3pl_connector.manifest_max_concurrent',
+        default=0,
+        help="Manifest imports through the API processed at the same time across all Odoo workers. Extra "
+             "requests get 429 with Retry-After. 0 = no limit."
+    )
+
     # === Tracking Settings ===
     logistics_3pl_tracking_url_base = fields.Char(
         string="Tracking URL Base",
@@ -83,6 +273,34 @@ class ResConfigSettings(models.TransientModel):
         help="Base URL for tracking. The tracking number will be appended."
     )
     
+    logistics_3pl_tracking_poll = fields.Boolean(
+        string="Automatic Tracking Polling",
+        config_parameter='logistics_3pl_connector.tracking_poll',
+        default=False,
+        help="Periodically fetch tracking for orders sent to e-Transport. Polls get more frequent "
+             "close to the ETA / delivery window and back off otherwise."
+    )
+    logistics_3pl_poll_min_interval = fields.Integer(
+        string="Minimum Poll Interval (min)",
+        config_parameter='logistics_3pl_connector.poll_min_interval',
+        default=10,
+        help="Shortest time between two tracking polls of the same order, used inside the delivery window."
+    )
+    logistics_3pl_poll_max_interval = fields.Integer(
+        string="Maximum Poll Interval (min)",
+        config_parameter='logistics_3pl_connector.poll_max_interval',
+        default=240,
+        help="Longest time between two tracking polls of the same order."
+    )
+    logistics_3pl_status_cache_ttl = fields.Integer(
+        string="Status API Cache (s)",
+        config_parameter='logistics_3pl_connector.status_cache_ttl',
+        default=30,
+        help="How long answers of the /api/v1/3pl/status endpoint are cached per order reference, at most 60 s. "
+             "Each Odoo worker has its own cache, so an answer may lag a status change by up to this time. "
+             "0 disables the cache."
+    )
+    
     # === Warehouse & User Settings ===
     # Explicitly remove config_parameter from here as it causes issues with Many2one
     logistics_3pl_warehouse_id = fields.Many2one(
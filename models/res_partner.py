@@ -0,0 +1,58 @@
+import hashlib
+import json
+from odoo import fields, models, api
+
+
+def _clean(value):
+    """Collapse whitespace so cosmetic edits don't change the snapshot hash."""
+    return ' '.join((value or '').split())
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    # Normalized e-Transport destination (Leg address block) for this partner.
+    # Recomputed on partner writes; payloads and resend detection reuse it.
+    x_etransport_leg = fields.Json(
+        string="e-Transport Destination", compute='_compute_etransport_leg', store=True)
+    x_etransport_leg_hash = fields.Char(
+        string="e-Transport Destination Hash", compute='_compute_etransport_leg', store=True,
+        help="Fingerprint of the e-Transport destination block, used to detect address changes")
+
+    def _etransport_leg_depends(self):
+        deps = ['name', 'street', 'city', 'zip', 'country_id.code', 'phone', 'email']
+        # mobile only exists on some versions / with some modules installed
+        if 'mobile' in self._fields:
+            deps.append('mobile')
+        return deps
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Sent deliveries to these addresses must be updated in e-Transport
+        leg_fields = {name.split('.')[0] for name in self._etransport_leg_depends()}
+        push_updates = self.env['ir.config_parameter'].sudo().get_param(
+            'logistics_3pl_connector.push_updates', 'False').lower() == 'true'
+        if push_updates and not leg_fields.isdisjoint(vals):
+            self.env['stock.picking'].search([
+                ('partner_id', 'in', self.ids),
+                ('x_3pl_status', '=', 'sent'),
+                ('state', 'not in', ('done', 'cancel')),
+            ])._3pl_mark_dirty()
+        return res
+
+    @api.depends(lambda self: self._etransport_leg_depends())
+    def _compute_etransport_leg(self):
+        for partner in self:
+            leg = {
+                'UnLoadName': _clean(partner.name),
+                'UnLoadAddress': _clean(partner.street),
+                'UnLoadCity': _clean(partner.city),
+                'UnLoadZip': _clean(partner.zip).replace(' ', ''),
+                'UnLoadCountry': (partner.country_id.code or 'ES').upper(),
+                'UnLoadTel': _clean(partner.phone or getattr(partner, 'mobile', '') or ''),
+                'UnLoadEmail': _clean(partner.email).lower(),
+            }
+            partner.x_etransport_leg = leg
+            partner.x_etransport_leg_hash = hashlib.sha1(
+                json.dumps(leg, sort_keys=True, ensure_ascii=False).encode('utf-8')
+            ).hexdigest()
@@ -0,0 +1,26 @@
+from odoo import models, api
+
+
+class StockMove(models.Model):
+    _inherit = 'stock.move'
+
+    # Goods of an order already sent to e-Transport changed: schedule an update
+    # (or a cancellation), see stock.picking._3pl_mark_dirty
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        moves = super().create(vals_list)
+        moves.picking_id._3pl_mark_dirty()
+        return moves
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'product_uom_qty' in vals or 'product_id' in vals or vals.get('state') == 'cancel':
+            self.picking_id._3pl_mark_dirty()
+        return res
+
+    def unlink(self):
+        pickings = self.picking_id
+        res = super().unlink()
+        pickings.exists()._3pl_mark_dirty()
+        return res
@@ -1,10 +1,25 @@
 import requests
+import collections
+import contextlib
+import cProfile
+import csv
+import functools
 import logging
+import psycopg2
 import os
 import json
-from datetime import datetime
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from odoo.http import request
+from odoo.tools import html2plaintext, split_every
+from markupsafe import Markup
 
 _logger = logging.getLogger(__name__)
 
@@ -14,18 +29,48 @@ DEBUG_LOG_PATHS = [
     '/tmp/3pl_debug.log',
 ]
 
+# Traffic capture file paths (JSON Lines, one exchange per line), see _record_traffic
+TRAFFIC_LOG_PATHS = [
+    '/var/log/odoo/3pl_traffic.jsonl',
+    '/tmp/3pl_traffic.jsonl',
+]
+
+# Slow request captures (timings + optional cProfile stats), see _3pl_timed
+PROFILE_DIRS = [
+    '/var/log/odoo/3pl_profiles',
+    '/tmp/3pl_profiles',
+]
+
+# Statuses accepted from the 3PL (webhooks, manifests) and picking states they may update
+WEBHOOK_STATUSES = ['shipped', 'delivered', 'completed', 'error']
+WEBHOOK_PICKING_STATES = ['waiting_3pl', 'assigned']
+# Advisory lock keys of the webhook concurrency slots shared by all the
+# workers of a database, see _try_advisory_slot
+WEBHOOK_SLOT_LOCK = 3001
+WEBHOOK_VALIDATION_SLOT_LOCK = 3002
+MANIFEST_SLOT_LOCK = 3004
+# Advisory lock key serializing the opening of waves, see logistics.3pl.send.batch._wave_enqueue
+WAVE_OPEN_LOCK = 3003
 
-def _get_debug_log_path():
+# Summary notes left by the retention of the connector's chatter notes (see _cron_3pl_retention)
+RETENTION_SUMMARY_MARKER = 'e-Transport history'
+RETENTION_SUMMARY_MAX_LINES = 200
+
+_traffic_lock = threading.Lock()
+_timing = threading.local()
+
+
+def _get_debug_log_path(paths=DEBUG_LOG_PATHS):
     """Get writable debug log path."""
-    for path in DEBUG_LOG_PATHS:
+    for path in paths:
         log_dir = os.path.dirname(path)
         if os.path.exists(log_dir) and os.access(log_dir, os.W_OK):
             return path
     # Fallback to /tmp
-    return '/tmp/3pl_debug.log'
+    return paths[-1]
 
 
-def _write_debug_log(method, url, headers, payload, response_status, response_body, picking_name=''):
+def _write_debug_log(method, url, headers, payload, response_status, response_body, picking_name='', timings=None):
     """
     Write API request/response to debug log file.
     
@@ -37,6 +82,7 @@ def _write_debug_log(method, url, headers, payload, response_status, response_bo
         response_status: HTTP status code
         response_body: Response body (string or dict)
         picking_name: Optional picking reference for context
+        timings: Optional per-phase timings of the request, see _RequestTimer.as_dict
     """
     log_path = _get_debug_log_path()
     timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
@@ -77,13 +123,510 @@ Picking: {picking_name or 'N/A'}
 {response_str}
 
 """
+    if timings:
+        log_entry += "--- TIMINGS ---\n" + ''.join(
+            f"{phase}: {values['ms']} ms, {values['sql']} queries\n" for phase, values in timings.items()
+        ) + "\n"
     
     try:
         with open(log_path, 'a', encoding='utf-8') as f:
             f.write(log_entry)
-        _logger.debug(f"Debug log written to {log_path}")
+        _logger.debug("Debug log written to %s", log_path)
     except Exception as e:
-        _logger.warning(f"Could not write debug log to {log_path}: {e}")
+        _logger.warning("Could not write debug log to %s: %s", log_path, e)
+
+
+def _record_traffic(kind, method, url, payload, response_status, response_body, duration_ms, ref=''):
+    """
+    Append one request/response exchange to the traffic capture file.
+
+    The file is meant to be replayed with scripts/replay_3pl_traffic.py, so
+    only the URL path is kept (the replay retargets it) and credentials are
+    never written.
+
+    Args:
+        kind: 'webhook', 'import' or 'tracking'
+        method: HTTP method
+        url: Full URL or path of the request
+        payload: Request body (dict, string or None)
+        response_status: HTTP status code
+        response_body: Response body (dict or string)
+        duration_ms: Time spent handling/waiting for the request
+        ref: Picking reference(s) the exchange is about
+    """
+    parts = requests.compat.urlsplit(url)
+    entry = {
+        'ts': round(time.time(), 3),
+        'kind': kind,
+        'method': method,
+        'path': parts.path + (f"?{parts.query}" if parts.query else ''),
+        'ref': ref,
+        'request': payload,
+        'status': response_status,
+        'response': response_body,
+        'ms': round(duration_ms, 1),
+    }
+    log_path = _get_debug_log_path(TRAFFIC_LOG_PATHS)
+    line = json.dumps(entry, ensure_ascii=False, separators=(',', ':'), default=str)
+    try:
+        with _traffic_lock, open(log_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except Exception as e:
+        _logger.warning("Could not record 3PL traffic to %s: %s", log_path, e)
+
+
+def _rotate_file(path, max_bytes, backups):
+    """
+    Rotate path to path.1 .. path.<backups> once it is larger than max_bytes.
+
+    Writers open the file by name for every entry, so they simply start a new
+    file after the rename. With no backups the file is removed.
+    """
+    try:
+        if os.path.getsize(path) <= max_bytes:
+            return False
+        for index in range(backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{index}"):
+                os.replace(f"{path}.{index}", f"{path}.{index + 1}")
+        if backups:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+    except OSError as e:
+        _logger.warning("Could not rotate %s: %s", path, e)
+        return False
+    return True
+
+
+def _prune_dir(directory, max_age_days):
+    """Delete the files of directory not modified in the last max_age_days, return how many."""
+    limit = time.time() - max_age_days * 86400
+    removed = 0
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.is_file() and entry.stat().st_mtime < limit:
+                os.remove(entry.path)
+                removed += 1
+        except OSError as e:
+            _logger.warning("Could not remove %s: %s", entry.path, e)
+    return removed
+
+
+class _LazyJSON:
+    """Defer json.dumps of a log argument until the record is actually emitted."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __str__(self):
+        return json.dumps(self.value, indent=2, ensure_ascii=False, default=str)
+
+
+def _log_sampled(logger, env, msg, *args):
+    """
+    Emit a per-request INFO summary line, keeping only a sample of them.
+
+    The sample rate comes from logistics_3pl_connector.log_sample_rate (1.0 =
+    every request). Warnings and errors are never sampled: only use this for
+    routine success lines.
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    try:
+        rate = float(env['ir.config_parameter'].sudo().get_param('logistics_3pl_connector.log_sample_rate', 1.0))
+    except (TypeError, ValueError):
+        rate = 1.0
+    if rate >= 1.0 or random.random() < rate:
+        logger.info(msg, *args)
+
+
+def _is_debug_mode(env):
+    """Whether full payloads may be logged (the connector's Debug Mode setting)."""
+    return env['ir.config_parameter'].sudo().get_param('logistics_3pl_connector.debug_mode', 'False').lower() == 'true'
+
+
+def _try_advisory_slot(cr, key, slots, session=False):
+    """
+    Take one of ``slots`` transaction-level advisory locks under ``key``, without waiting.
+
+    The locks are shared by every Odoo worker of the database, so at most
+    ``slots`` transactions hold one at the same time. Returns the slot taken,
+    or None when all of them are held. The slot is freed when the transaction
+    ends; with ``session``, it is kept across commits until released with
+    _release_advisory_slot.
+    """
+    function = 'pg_try_advisory_lock' if session else 'pg_try_advisory_xact_lock'
+    for slot in range(slots):
+        cr.execute(f"SELECT {function}(%s, %s)", [key, slot])
+        if cr.fetchone()[0]:
+            return slot
+    return None
+
+
+def _release_advisory_slot(cr, key, slot):
+    """Release a slot taken with ``session=True``, see _try_advisory_slot."""
+    cr.execute("SELECT pg_advisory_unlock(%s, %s)", [key, slot])
+
+
+def _advisory_slots_in_use(cr, key):
+    """Number of slots under ``key`` currently held in this database, see _try_advisory_slot."""
+    cr.execute("""
+        SELECT count(*) FROM pg_locks
+         WHERE locktype = 'advisory' AND granted AND objsubid = 2 AND classid = %s::oid
+           AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+    """, [key])
+    return cr.fetchone()[0]
+
+
+class _RequestTimer:
+    """
+    Wall time and SQL query count per phase of one send, tracking fetch or webhook.
+
+    Phases are closed with _lap(): each lap is charged with everything since
+    the previous one, so the phases add up to the total.
+    """
+
+    def __init__(self, kind, ref, cr):
+        self.kind = kind
+        self.ref = ref
+        self.cr = cr
+        self.phases = {}
+        self.debug_logs = []
+        self.profile = None
+        self.total_ms = 0.0
+        self.queries = 0
+        self.started = self.last_time = time.monotonic()
+        self.first_count = self.last_count = self._query_count()
+
+    def _query_count(self):
+        return getattr(self.cr, 'sql_log_count', 0)
+
+    def lap(self, phase):
+        now, count = time.monotonic(), self._query_count()
+        ms, queries = self.phases.get(phase, (0.0, 0))
+        self.phases[phase] = (ms + (now - self.last_time) * 1000, queries + count - self.last_count)
+        self.last_time, self.last_count = now, count
+
+    def start_profile(self):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            return
+        self.profile = profile
+
+    def stop(self):
+        if self.profile:
+            self.profile.disable()
+        if time.monotonic() - self.last_time > 0.0005:
+            self.lap('other')
+        self.total_ms = (time.monotonic() - self.started) * 1000
+        self.queries = self._query_count() - self.first_count
+
+    def as_dict(self):
+        timings = {phase: {'ms': round(ms, 1), 'sql': queries} for phase, (ms, queries) in self.phases.items()}
+        timings['total'] = {'ms': round(self.total_ms, 1), 'sql': self.queries}
+        return timings
+
+    def server_timing(self):
+        """Render the phases as a Server-Timing header value."""
+        return ', '.join(
+            f'{phase};dur={values["ms"]};desc="{values["sql"]} sql"' for phase, values in self.as_dict().items()
+        )
+
+
+def _lap(phase):
+    """Close a phase of the current timed request, see _RequestTimer.lap (no-op outside _3pl_timed)."""
+    timer = getattr(_timing, 'current', None)
+    if timer is not None:
+        timer.lap(phase)
+
+
+def _queue_debug_log(**kwargs):
+    """Write a debug log entry when the current timed request ends, with its timings (right away if untimed)."""
+    timer = getattr(_timing, 'current', None)
+    if timer is None:
+        _write_debug_log(**kwargs)
+    else:
+        timer.debug_logs.append(kwargs)
+
+
+def _save_slow_request(timer):
+    """Save the timings (and cProfile stats, when sampled) of a slow request to the profile directory."""
+    for profile_dir in PROFILE_DIRS:
+        try:
+            os.makedirs(profile_dir, exist_ok=True)
+        except OSError:
+            continue
+        if os.access(profile_dir, os.W_OK):
+            break
+    else:
+        _logger.warning("No writable directory to save 3PL profiles in: %s", PROFILE_DIRS)
+        return
+
+    safe_ref = re.sub(r'[^\w.-]+', '_', timer.ref or 'unknown')
+    stem = os.path.join(profile_dir, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{timer.kind}_{safe_ref}")
+    summary = {
+        'kind': timer.kind,
+        'ref': timer.ref,
+        'timings': timer.as_dict(),
+        'profile': f"{stem}.prof" if timer.profile else None,
+    }
+    try:
+        with open(f"{stem}.json", 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        if timer.profile:
+            timer.profile.dump_stats(f"{stem}.prof")
+    except OSError as e:
+        _logger.warning("Could not save 3PL profile to %s: %s", profile_dir, e)
+        return
+    _logger.info("Slow 3PL %s %s: %.0f ms, %s queries, saved to %s.json",
+                 timer.kind, timer.ref, timer.total_ms, timer.queries, stem)
+
+
+@contextlib.contextmanager
+def _3pl_timed(env, kind, ref='', set_header=True):
+    """
+    Time a send, tracking fetch or webhook phase by phase (see _lap).
+
+    When the request ends its timings are appended to the debug log entries
+    queued with _queue_debug_log and, inside an HTTP request, returned in a
+    Server-Timing header. Requests slower than
+    logistics_3pl_connector.profile_threshold_ms are saved to PROFILE_DIRS; a
+    sample of them (profile_sample_rate) is run under cProfile.
+
+    Nested calls share the outermost timer.
+    """
+    outer = getattr(_timing, 'current', None)
+    if outer is not None:
+        yield outer
+        return
+
+    config = env['ir.config_parameter'].sudo()
+    try:
+        threshold = float(config.get_param('logistics_3pl_connector.profile_threshold_ms', 0) or 0)
+        sample_rate = float(config.get_param('logistics_3pl_connector.profile_sample_rate', 0.1) or 0)
+    except (TypeError, ValueError):
+        threshold = sample_rate = 0
+    timer = _timing.current = _RequestTimer(kind, ref, env.cr)
+    if threshold > 0 and random.random() < sample_rate:
+        timer.start_profile()
+    try:
+        yield timer
+    finally:
+        _timing.current = None
+        timer.stop()
+        for entry in timer.debug_logs:
+            _write_debug_log(**entry, timings=timer.as_dict())
+        if threshold > 0 and timer.total_ms >= threshold:
+            _save_slow_request(timer)
+        if set_header and request and hasattr(request, 'future_response'):
+            request.future_response.headers['Server-Timing'] = timer.server_timing()
+
+
+def _timed(kind):
+    """Decorator running a single-picking method inside _3pl_timed."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with _3pl_timed(self.env, kind, self[:1].name or ''):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _manifest_format(filename):
+    """Guess a status manifest format from its file name: 'jsonl' or 'csv'."""
+    return 'jsonl' if (filename or '').lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def _iter_manifest_rows(stream, file_format):
+    """
+    Parse a 3PL status manifest lazily, yielding ``(line_no, data, error)``.
+
+    CSV files (comma, semicolon or tab separated) need a header row with the
+    webhook field names: order_id and/or tms_id, status, tracking_number,
+    tracking_url. JSON Lines files hold one webhook-like object per line.
+
+    Args:
+        stream: Text stream, read line by line
+        file_format: 'csv' or 'jsonl'
+    """
+    if file_format == 'jsonl':
+        for line_no, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(data, dict):
+                yield line_no, data, None
+            else:
+                yield line_no, None, "Expected a JSON object"
+        return
+
+    header = stream.readline()
+    try:
+        dialect = csv.Sniffer().sniff(header, delimiters=',;\t')
+    except csv.Error:
+        dialect = csv.excel
+    fieldnames = [name.strip().lower() for name in next(csv.reader([header], dialect), [])]
+    reader = csv.DictReader(stream, fieldnames=fieldnames, dialect=dialect)
+    for row in reader:
+        data = {key: (value or '').strip() for key, value in row.items() if key and isinstance(value, str)}
+        if any(data.values()):
+            # +1 for the header line read above
+            yield reader.line_num + 1, data, None
+
+
+# Local copy of the /tms/import-data Order schema (3PL_INTEGRATION_SPECS.md, 2.2):
+# (field, required, type(s), full-match pattern). Compiled once, see _etransport_order_issues.
+ETRANSPORT_ORDER_SCHEMA = {
+    'order': [
+        ('ExternalRef', True, str, None),
+        ('ShipmentType', True, str, None),
+        ('ServiceType', True, str, None),
+        ('Legs', True, list, None),
+    ],
+    'leg': [
+        ('UnLoadName', True, str, None),
+        ('UnLoadAddress', True, str, None),
+        ('UnLoadCity', True, str, None),
+        ('UnLoadZip', True, str, None),
+        ('UnLoadCountry', True, str, r'[A-Z]{2}'),
+        ('UnLoadDate', False, str, r'\d{4}-\d{2}-\d{2}'),
+        ('UnLoadStartTime', False, str, r'([01]\d|2[0-3]):[0-5]\d'),
+        ('UnLoadEndTime', False, str, r'([01]\d|2[0-3]):[0-5]\d|24:00'),
+        ('UnLoadTel', False, str, None),
+        ('UnLoadEmail', False, str, None),
+        ('Goods', True, list, None),
+    ],
+    'good': [
+        ('Packs', False, int, None),
+        ('PacksTypeID', True, str, None),
+        ('PacksDescription', False, str, None),
+        ('PacksTemperature', True, str, r'AM|FR|CO'),
+        ('GrossWeight', False, (int, float), None),
+        ('Cube', False, (int, float), None),
+    ],
+}
+
+# Postal code formats of the countries e-Transport delivers to
+ETRANSPORT_ZIP_PATTERNS = {
+    'ES': r'(0[1-9]|[1-4]\d|5[0-2])\d{3}',
+    'AD': r'AD\d{3}',
+    'PT': r'\d{4}-?\d{3}',
+    'FR': r'\d{5}',
+}
+
+
+def _compile_schema(schema):
+    return {
+        section: [
+            (name, required, types, re.compile(pattern).fullmatch if pattern else None)
+            for name, required, types, pattern in rules
+        ]
+        for section, rules in schema.items()
+    }
+
+
+_ORDER_RULES = _compile_schema(ETRANSPORT_ORDER_SCHEMA)
+_ZIP_MATCHERS = {country: re.compile(pattern).fullmatch for country, pattern in ETRANSPORT_ZIP_PATTERNS.items()}
+
+
+def _check_section(env, data, section, where, issues):
+    for name, required, types, match in _ORDER_RULES[section]:
+        value = data.get(name)
+        if value is None or value == '' or value == []:
+            if required:
+                issues.append(env._("%(where)s%(field)s is missing", where=where, field=name))
+            continue
+        # bool is an int subclass but never a valid number here
+        if not isinstance(value, types) or isinstance(value, bool):
+            issues.append(env._("%(where)s%(field)s has an invalid type (%(type)s)",
+                                where=where, field=name, type=type(value).__name__))
+        elif match and not match(value):
+            issues.append(env._("%(where)s%(field)s has an invalid value: %(value)r",
+                                where=where, field=name, value=value))
+
+
+def _etransport_order_issues(env, order, shipment_types=(), service_types=()):
+    """
+    Check one import Order against the schema and e-Transport's business rules.
+
+    Returns every problem found (an empty list for a valid order), so that
+    they can all be fixed before the order is sent.
+
+    Args:
+        env: Environment the issues are translated with
+        order: Order dict, as built by _prepare_etransport_payload
+        shipment_types: ShipmentType codes known to e-Transport (empty = any)
+        service_types: ServiceType codes known to e-Transport (empty = any)
+    """
+    issues = []
+    _check_section(env, order, 'order', '', issues)
+    if shipment_types and order.get('ShipmentType') and order['ShipmentType'] not in shipment_types:
+        issues.append(env._("ShipmentType %r is not known to e-Transport", order['ShipmentType']))
+    if service_types and order.get('ServiceType') and order['ServiceType'] not in service_types:
+        issues.append(env._("ServiceType %r is not known to e-Transport", order['ServiceType']))
+
+    legs = order.get('Legs') if isinstance(order.get('Legs'), list) else []
+    for leg_no, leg in enumerate(legs, 1):
+        where = env._("Leg %s: ", leg_no) if len(legs) > 1 else ''
+        if not isinstance(leg, dict):
+            issues.append(env._("%sinvalid leg", where))
+            continue
+        _check_section(env, leg, 'leg', where, issues)
+
+        zip_match = _ZIP_MATCHERS.get(leg.get('UnLoadCountry'))
+        if zip_match and isinstance(leg.get('UnLoadZip'), str) and leg['UnLoadZip'] and not zip_match(leg['UnLoadZip']):
+            issues.append(env._("%(where)sUnLoadZip %(zip)r is not a valid %(country)s postal code",
+                                where=where, zip=leg['UnLoadZip'], country=leg['UnLoadCountry']))
+        start, end = leg.get('UnLoadStartTime'), leg.get('UnLoadEndTime')
+        if bool(start) != bool(end):
+            issues.append(env._("%sthe delivery window needs both UnLoadStartTime and UnLoadEndTime", where))
+        elif start and end and isinstance(start, str) and isinstance(end, str) and start >= end:
+            issues.append(env._("%(where)sthe delivery window ends before it starts (%(start)s-%(end)s)",
+                                where=where, start=start, end=end))
+
+        goods = leg.get('Goods') if isinstance(leg.get('Goods'), list) else []
+        total_weight = 0.0
+        for good in goods:
+            if not isinstance(good, dict):
+                issues.append(env._("%sinvalid Goods line", where))
+                continue
+            good_where = env._("%(where)sGoods %(type)s: ", where=where, type=good.get('PacksTypeID') or '?')
+            _check_section(env, good, 'good', good_where, issues)
+            packs = good.get('Packs')
+            if isinstance(packs, int) and packs <= 0:
+                issues.append(env._("%(where)sPacks must be positive (%(packs)s)", where=good_where, packs=packs))
+            if isinstance(good.get('GrossWeight'), (int, float)):
+                total_weight += good['GrossWeight']
+            if isinstance(good.get('Cube'), (int, float)) and good['Cube'] < 0:
+                issues.append(env._("%sCube is negative", good_where))
+        if goods and total_weight <= 0:
+            issues.append(env._("%sGrossWeight is zero (products without weight)", where))
+    return issues
+
+
+def _post_etransport_import(url, headers, payload, timeout=30):
+    """
+    POST a payload to /tms/import-data.
+
+    Kept free of ORM access so it can run in worker threads: it only returns
+    the raw ``requests.Response`` and lets exceptions propagate to the caller.
+    """
+    return requests.post(url, json=payload, headers=headers, timeout=timeout)
+
 
 class StockPicking(models.Model):
     _inherit = 'stock.picking'
@@ -115,8 +658,52 @@ class StockPicking(models.Model):
         string="Is Web Order",
         help="True if this picking originates from an eCommerce order"
     )
+    x_3pl_batch_id = fields.Many2one('logistics.3pl.send.batch', string="3PL Send Batch",
+        readonly=True, copy=False, index='btree_not_null')
+    x_3pl_queue_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ], string="3PL Queue State", readonly=True, copy=False,
+        help="Progress of this delivery inside a background send batch")
+    x_3pl_state_changed_at = fields.Datetime(string="e-Transport State Changed", readonly=True, copy=False,
+        help="When e-Transport last reported a different state for this order")
+    x_3pl_next_poll_at = fields.Datetime(string="Next Tracking Poll", readonly=True, copy=False,
+        index='btree_not_null',
+        help="When the tracking poller will next query e-Transport. Empty once the order is no longer in flight.")
+    x_3pl_sent_leg_hash = fields.Char(string="Sent Destination Hash", readonly=True, copy=False,
+        help="Destination fingerprint of the partner when this delivery was last sent to e-Transport")
+    x_3pl_leg_outdated = fields.Boolean(
+        string="Destination Changed Since Sent",
+        compute='_compute_3pl_leg_outdated', store=True,
+        help="The delivery address changed after this order was sent to e-Transport; it needs a resend")
+    x_3pl_consolidation_ref = fields.Char(string="Consolidated e-Transport Order", readonly=True, copy=False,
+        index='btree_not_null',
+        help="ExternalRef of the e-Transport order this delivery was consolidated into, shared by every "
+             "delivery of that order. Webhooks and tracking for it update all of them.")
+    x_3pl_lane = fields.Selection([
+        ('urgent', 'Urgent'),
+        ('normal', 'Normal'),
+        ('bulk', 'Bulk'),
+    ], string="3PL Send Lane", readonly=True, copy=False,
+        help="Priority of this delivery in the background send queue, see _3pl_compute_lane")
+    x_3pl_queued_at = fields.Datetime(string="Queued for 3PL", readonly=True, copy=False)
+    x_3pl_queue_wait = fields.Float(string="3PL Queue Wait (s)", readonly=True, copy=False, aggregator='avg',
+        help="Time this delivery waited in the send queue before e-Transport accepted it")
+    x_3pl_update_pending = fields.Selection([
+        ('update', 'Update'),
+        ('cancel', 'Cancellation'),
+    ], string="Pending e-Transport Sync", readonly=True, copy=False,
+        help="Change of this sent delivery waiting to be pushed to e-Transport. Without a due date, "
+             "the change was refused by the pre-flight check and e-Transport still has the previous data")
+    x_3pl_update_due_at = fields.Datetime(string="e-Transport Sync Due", readonly=True, copy=False,
+        index='btree_not_null',
+        help="When the pending change is pushed: edits made until then go out in the same update")
+    x_3pl_preflight_issues = fields.Text(string="e-Transport Pre-flight Issues",
+        compute='_compute_3pl_preflight_issues',
+        help="Problems e-Transport would reject this delivery for, checked locally before sending")
     
-    @api.depends('move_ids.state', 'x_3pl_status')
+    @api.depends('move_ids.state')
     def _compute_state(self):
         """
         Override to preserve 'waiting_3pl' state.
@@ -130,6 +717,10 @@ class StockPicking(models.Model):
         - x_3pl_status is 'sent' (sent to 3PL, waiting for confirmation)
         - The computed state would otherwise be 'assigned' or 'waiting_3pl'
         - The picking is NOT done or cancelled
+        
+        x_3pl_status is deliberately not a dependency: status writes only
+        set or lift the hold (see _3pl_apply_hold) instead of re-deriving the
+        state of every written picking from its moves.
         """
         # First, let the parent compute the state
         super()._compute_state()
@@ -179,6 +770,21 @@ class StockPicking(models.Model):
                 picking.x_3pl_status in ('sent', 'shipped', 'delivered')
             )
     
+    @api.depends('x_3pl_status', 'x_3pl_sent_leg_hash', 'partner_id.x_etransport_leg_hash')
+    def _compute_3pl_leg_outdated(self):
+        for picking in self:
+            picking.x_3pl_leg_outdated = bool(
+                picking.x_3pl_status == 'sent'
+                and picking.x_3pl_sent_leg_hash
+                and picking.x_3pl_sent_leg_hash != picking.partner_id.x_etransport_leg_hash
+            )
+    
+    def _compute_3pl_preflight_issues(self):
+        # Same source as the pre-flight report (action_3pl_preflight_check)
+        issues = self._3pl_preflight_issues()
+        for picking in self:
+            picking.x_3pl_preflight_issues = '\n'.join(issues.get(picking.id, [])) or False
+
     @api.depends('sale_id')
     def _compute_is_web_order(self):
         """Check if picking comes from a website order.
@@ -198,6 +804,49 @@ class StockPicking(models.Model):
                     is_web = True
             picking.x_is_web_order = is_web
     
+    def _3pl_try_lock(self):
+        """
+        Lock the rows of these pickings for the rest of the transaction, without waiting.
+
+        FOR NO KEY UPDATE is the lock a plain UPDATE takes: it conflicts with
+        concurrent writes to the pickings but not with inserts of rows that
+        reference them (chatter messages, deferred events).
+
+        Returns False if another transaction already holds one of the locks.
+        """
+        if not self.ids:
+            return True
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(
+                    "SELECT id FROM stock_picking WHERE id IN %s FOR NO KEY UPDATE NOWAIT",
+                    [tuple(self.ids)],
+                )
+        except psycopg2.errors.LockNotAvailable:
+            return False
+        return True
+
+    def _3pl_lock_available(self):
+        """Lock the pickings nobody else is working on and return them; skip the others."""
+        if not self.ids:
+            return self
+        self.env.cr.execute(
+            "SELECT id FROM stock_picking WHERE id IN %s ORDER BY id FOR NO KEY UPDATE SKIP LOCKED",
+            [tuple(self.ids)],
+        )
+        locked_ids = {row[0] for row in self.env.cr.fetchall()}
+        return self.filtered(lambda p: p.id in locked_ids)
+
+    def _3pl_message_post(self, body, **kwargs):
+        """Post a connector note, tagged with the e-Transport Update subtype (see _cron_3pl_retention)."""
+        return self.message_post(body=body, subtype_xmlid='logistics_3pl_connector.mt_3pl_update', **kwargs)
+
+    def _3pl_message_log_batch(self, bodies, author_id=None):
+        """Log connector notes in bulk, tagged like _3pl_message_post."""
+        messages = self._message_log_batch(bodies=bodies, author_id=author_id)
+        messages.subtype_id = self.env.ref('logistics_3pl_connector.mt_3pl_update')
+        return messages
+
     def action_open_3pl_tracking(self):
         """Open the tracking URL in a new browser tab."""
         self.ensure_one()
@@ -227,84 +876,63 @@ class StockPicking(models.Model):
         # If it's a manual/internal order → use Internal ShipmentType (M)
         return config.get_param('logistics_3pl_connector.shipment_type_internal', 'M')
     
-    def _get_contact_info(self):
+    def _get_etransport_service_type(self):
+        """ServiceType of the e-Transport order for this delivery."""
+        config = self.env['ir.config_parameter'].sudo()
+        return config.get_param('logistics_3pl_connector.service_type', 'ND_3H')
+
+    def _prepare_etransport_payload(self):
         """
-        Get contact phone and email for the delivery.
-        Always uses partner's (customer) contact info. If not available, returns empty strings.
+        Build payload for e-Transport TMS API.
+
+        Several deliveries of one consolidation group (see
+        _3pl_consolidation_groups) are sent as a single Order: the first one
+        gives the ExternalRef, destination and slot, and their Goods are merged.
         """
-        partner = self.partner_id
-        
-        # Get phone: try partner.phone, then partner.mobile (if exists)
-        phone = partner.phone or getattr(partner, 'mobile', '') or ''
-        email = partner.email or ''
-        
-        return phone, email
-    
-    def _prepare_etransport_payload(self):
-        """Build payload for e-Transport TMS API"""
-        self.ensure_one()
+        lead = self[:1]
+        lead.ensure_one()
         config = self.env['ir.config_parameter'].sudo()
         
         # Get config values
-        shipment_type = self._get_etransport_shipment_type()
-        service_type = config.get_param('logistics_3pl_connector.service_type', 'ND_3H')
+        shipment_type = lead._get_etransport_shipment_type()
+        service_type = lead._get_etransport_service_type()
         default_temp = config.get_param('logistics_3pl_connector.default_temperature', 'FR')
         
-        partner = self.partner_id
-        
-        # Get contact info (uses user info for internal orders)
-        contact_phone, contact_email = self._get_contact_info()
-        
         # Build Goods - one line per move
+        # Product descriptors are precomputed on product.product, see
+        # _compute_etransport_descriptor; here we only scale them by quantity.
         goods = []
         for move in self.move_ids.filtered(lambda m: m.state != 'cancel'):
             product = move.product_id
             qty = move.product_uom_qty
-            
-            # PacksTypeID: use default_code, or generate from product name
-            packs_type_id = product.default_code
-            if not packs_type_id:
-                name = (product.name or 'generic').lower()
-                if '-' in name:
-                    # Has hyphen: just remove spaces
-                    packs_type_id = name.replace(' ', '')
-                else:
-                    # No hyphen: replace spaces with hyphens
-                    # Use split/join to handle multiple spaces
-                    packs_type_id = '-'.join(name.split())
-            
+
             good = {
                 'Packs': int(qty),
-                'PacksTypeID': packs_type_id,
-                'PacksDescription': product.name,
-                'PacksTemperature': default_temp,
-                'GrossWeight': round((product.weight or 0) * qty, 2),
+                'PacksTypeID': product.x_etransport_packs_type_id,
+                'PacksDescription': product.x_etransport_description,
+                'PacksTemperature': product.x_etransport_temperature or default_temp,
+                'GrossWeight': round(product.x_etransport_unit_weight * qty, 2),
                 'Parcels': []
             }
             # Cube only if product has volume
-            if product.volume:
-                good['Cube'] = round(product.volume * qty, 3)
+            if product.x_etransport_unit_volume:
+                good['Cube'] = round(product.x_etransport_unit_volume * qty, 3)
             
             goods.append(good)
+
+        if len(self) > 1:
+            goods = self._merge_etransport_goods(goods)
         
-        # Build Leg (delivery destination)
-        leg = {
-            'UnLoadName': partner.name or '',
-            'UnLoadAddress': partner.street or '',
-            'UnLoadCity': partner.city or '',
-            'UnLoadZip': partner.zip or '',
-            'UnLoadCountry': partner.country_id.code if partner.country_id else 'ES',
-            'UnLoadTel': contact_phone,
-            'UnLoadEmail': contact_email,
-            'Goods': goods,
-        }
+        # Build Leg (delivery destination) from the partner's cached snapshot,
+        # see res.partner._compute_etransport_leg
+        leg = dict(lead.partner_id.x_etransport_leg or {}, Goods=goods)
         
         # Add delivery date/time from delivery_time_slots module if available
-        if hasattr(self, 'scheduled_delivery_date') and self.scheduled_delivery_date:
-            leg['UnLoadDate'] = self.scheduled_delivery_date.strftime('%Y-%m-%d')
+        if hasattr(lead, 'scheduled_delivery_date') and lead.scheduled_delivery_date:
+            leg['UnLoadDate'] = lead.scheduled_delivery_date.strftime('%Y-%m-%d')
         
-        if hasattr(self, 'delivery_time_slot_id') and self.delivery_time_slot_id:
-            slot = self.delivery_time_slot_id
+        if hasattr(lead, 'delivery_time_slot_id') and lead.delivery_time_slot_id:
+            slot = lead.delivery_time_slot_id
             if slot.exists() and hasattr(slot, 'start_hour') and hasattr(slot, 'end_hour'):
                 if slot.start_hour is not None and slot.end_hour is not None:
                     leg['UnLoadStartTime'] = self._format_time_slot(slot.start_hour)
@@ -312,7 +940,7 @@ class StockPicking(models.Model):
         
         # Build Order
         order = {
-            'ExternalRef': self.name,
+            'ExternalRef': lead.name,
             'ShipmentType': shipment_type,
             'ServiceType': service_type,
             'Legs': [leg]
@@ -320,6 +948,146 @@ class StockPicking(models.Model):
         
         return {'Orders': [order]}
 
+    @staticmethod
+    def _merge_etransport_goods(goods):
+        """Merge Goods lines of the same pack type, description and temperature (consolidated orders)."""
+        merged = {}
+        for good in goods:
+            key = (good['PacksTypeID'], good['PacksDescription'], good['PacksTemperature'])
+            if key not in merged:
+                merged[key] = dict(good, Parcels=list(good['Parcels']))
+                continue
+            line = merged[key]
+            line['Packs'] += good['Packs']
+            line['GrossWeight'] = round(line['GrossWeight'] + good['GrossWeight'], 2)
+            line['Parcels'].extend(good['Parcels'])
+            if 'Cube' in good:
+                line['Cube'] = round(line.get('Cube', 0.0) + good['Cube'], 3)
+        return list(merged.values())
+
+    @api.model
+    def _3pl_known_codes(self):
+        """ShipmentType and ServiceType codes known to e-Transport (empty sets = any), see _3pl_payload_issues."""
+        config = self.env['ir.config_parameter'].sudo()
+        return tuple(
+            {code.strip() for code in (config.get_param(f'logistics_3pl_connector.{key}') or '').split(',')
+             if code.strip()}
+            for key in ('known_shipment_types', 'known_service_types')
+        )
+
+    def _3pl_payload_issues(self, payload, known=None):
+        """
+        Every problem e-Transport would reject an import payload for, checked locally.
+
+        ``known`` is the result of _3pl_known_codes; loops over many payloads
+        read it once and pass it in.
+        """
+        shipment_types, service_types = known or self._3pl_known_codes()
+        issues = []
+        for order in payload.get('Orders') or []:
+            issues.extend(_etransport_order_issues(self.env, order, shipment_types, service_types))
+        return issues
+
+    def _3pl_preflight_issues(self):
+        """
+        Check whether these deliveries can be sent, without calling e-Transport.
+
+        Returns ``{picking_id: [issue, ...]}`` for the deliveries with problems:
+        the state checks done on send, then the payload validation. The payload
+        is only built for deliveries passing the state checks, which keeps the
+        check cheap on pickings that cannot be sent anyway.
+        """
+        result = {}
+        known = self._3pl_known_codes()
+        for picking in self:
+            issues = []
+            if not picking.x_3pl_eligible:
+                issues.append(_("Not an outgoing delivery of the 3PL warehouse"))
+            if picking.state != 'assigned':
+                issues.append(_("Not ready (state: %s)") % picking.state)
+            if picking.x_3pl_status not in ('draft', 'error'):
+                issues.append(_("Already sent to e-Transport"))
+            if not picking.partner_id:
+                issues.append(_("No delivery address"))
+            if not issues:
+                issues = picking._3pl_payload_issues(picking._prepare_etransport_payload(), known)
+            if issues:
+                result[picking.id] = issues
+        return result
+
+    def action_3pl_preflight_check(self):
+        """List the selected deliveries that would not be accepted by e-Transport, and why."""
+        issues = self._3pl_preflight_issues()
+        if not issues:
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _("Pre-flight check"),
+                    'message': _("The %s selected deliveries can be sent to e-Transport.") % len(self),
+                    'type': 'success',
+                    'sticky': False,
+                },
+            }
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _("Pre-flight check: %s of %s deliveries with issues") % (len(issues), len(self)),
+            'res_model': 'stock.picking',
+            'view_mode': 'list,form',
+            'views': [(self.env.ref('logistics_3pl_connector.view_picking_3pl_preflight_list').id, 'list'),
+                      (False, 'form')],
+            'domain': [('id', 'in', list(issues))],
+            'context': {'create': False},
+        }
+
+    def _3pl_consolidation_key(self):
+        """
+        Deliveries with the same key share an e-Transport order when consolidating:
+        same customer, destination, delivery date, time slot and shipment type.
+        """
+        self.ensure_one()
+        partner = self.partner_id
+        if not partner or not partner.x_etransport_leg_hash:
+            return None
+        delivery_date = getattr(self, 'scheduled_delivery_date', False) or self.scheduled_date
+        if isinstance(delivery_date, datetime):
+            # Stored in UTC: group by the local day, not the UTC one
+            delivery_date = delivery_date.replace(tzinfo=timezone.utc).astimezone(self._3pl_local_tz()).date()
+        slot = getattr(self, 'delivery_time_slot_id', False)
+        return (
+            partner.id,
+            partner.x_etransport_leg_hash,
+            str(delivery_date or ''),
+            slot.id if slot else 0,
+            self.picking_type_id.warehouse_id.id,
+            self._get_etransport_shipment_type(),
+        )
+
+    def _3pl_consolidation_groups(self):
+        """
+        Split deliveries into the groups sent as one e-Transport order each.
+
+        Without the consolidate setting every delivery is its own group.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        if config.get_param('logistics_3pl_connector.consolidate', 'False').lower() != 'true':
+            return [picking for picking in self]
+        groups = {}
+        for picking in self:
+            key = picking._3pl_consolidation_key() or ('single', picking.id)
+            groups.setdefault(key, []).append(picking.id)
+        return [self.browse(ids) for ids in groups.values()]
+
+    def _3pl_consolidated_members(self):
+        """All deliveries sent in the same e-Transport order as this one (itself included)."""
+        self.ensure_one()
+        if not self.x_3pl_consolidation_ref:
+            return self
+        members = self.search([('x_3pl_consolidation_ref', '=', self.x_3pl_consolidation_ref)], order='id') | self
+        # The delivery named after the order leads it (ExternalRef, destination)
+        return members.filtered(lambda p: p.name == self.x_3pl_consolidation_ref) | members
+
+    @_timed('send')
     def action_send_to_3pl(self):
         """
         Send picking to e-Transport TMS. Changes state to 'waiting_3pl' on success.
@@ -338,6 +1106,13 @@ class StockPicking(models.Model):
         target_warehouse_id = config.get_param('logistics_3pl_connector.warehouse_id')
         allow_resend = config.get_param('logistics_3pl_connector.allow_resend', 'False').lower() == 'true'
         
+        # Serialize with webhooks / other sends touching the same picking
+        if not self._3pl_try_lock():
+            raise UserError(_(
+                "This delivery is being updated by another operation (e-Transport send or webhook). "
+                "Please try again in a few seconds."
+            ))
+        
         # Determine send type for logging and messages
         previous_status = self.x_3pl_status
         is_resend = previous_status in ('sent', 'shipped', 'delivered')
@@ -350,13 +1125,15 @@ class StockPicking(models.Model):
                 "Please enable 'Allow Resend to 3PL' in Inventory Settings to use this feature."
             ))
         
-        # Log appropriately based on status
-        if is_resend:
-            _logger.info(f"Resending picking {self.name} to e-Transport (previous status: {previous_status})")
-        elif is_retry:
-            _logger.info(f"Retrying send to e-Transport for picking {self.name} (previous attempt failed)")
-        else:
-            _logger.info(f"Sending picking {self.name} to e-Transport for the first time")
+        send_kind = 'resend' if is_resend else 'retry' if is_retry else 'first send'
+
+        # A consolidated order is resent as a whole; first sends and retries go alone
+        members = self._3pl_consolidated_members() if is_resend else self
+        if len(members) > 1 and not members._3pl_try_lock():
+            raise UserError(_(
+                "This delivery is being updated by another operation (e-Transport send or webhook). "
+                "Please try again in a few seconds."
+            ))
 
         # Check warehouse filter
         if target_warehouse_id:
@@ -370,34 +1147,49 @@ class StockPicking(models.Model):
         if not api_url or not api_key:
             raise UserError(_("3PL API configuration is missing. Please check Inventory Settings."))
 
+        _lap('checks')
+
         # Build e-Transport payload
-        payload = self._prepare_etransport_payload()
+        payload = members._prepare_etransport_payload()
+        external_ref = payload['Orders'][0]['ExternalRef']
+        issues = self._3pl_payload_issues(payload)
+        _lap('payload')
+        if issues:
+            raise UserError(_("%s was not sent, e-Transport would reject it:\n%s") % (
+                self.name, '\n'.join(f"• {issue}" for issue in issues)))
         
         headers = {
             'Content-Type': 'application/json',
             'X-API-Key': api_key  # e-Transport uses X-API-Key header
         }
 
+        debug_mode = _is_debug_mode(self.env)
+
         try:
             full_url = f"{api_url}/tms/import-data"
-            _logger.info(f"Sending Picking {self.name} to e-Transport at {full_url}")
-            _logger.debug(f"Payload being sent: {json.dumps(payload, indent=2, default=str)}")
+            if debug_mode:
+                _logger.debug("Sending %s to e-Transport at %s (%s), payload: %s",
+                              self.name, full_url, send_kind, _LazyJSON(payload))
             
+            started = time.monotonic()
             response = requests.post(
                 full_url,
                 json=payload,
                 headers=headers,
                 timeout=30
             )
+            duration_ms = (time.monotonic() - started) * 1000
+            _lap('http')
             
-            # Write debug log if enabled
-            debug_mode = config.get_param('logistics_3pl_connector.debug_mode', 'False').lower() == 'true'
-            if debug_mode:
+            # Write debug log / traffic capture if enabled
+            record_traffic = config.get_param('logistics_3pl_connector.record_traffic', 'False').lower() == 'true'
+            if debug_mode or record_traffic:
                 try:
                     response_data_for_log = response.json()
                 except Exception:
                     response_data_for_log = response.text
-                _write_debug_log(
+            if debug_mode:
+                _queue_debug_log(
                     method='POST',
                     url=full_url,
                     headers=headers,
@@ -406,29 +1198,39 @@ class StockPicking(models.Model):
                     response_body=response_data_for_log,
                     picking_name=self.name
                 )
+            if record_traffic:
+                _record_traffic('import', 'POST', full_url, payload, response.status_code,
+                                response_data_for_log, duration_ms, ref=self.name)
+            _lap('log')
             
             if response.status_code == 200:
                 response_data = response.json()
                 status = response_data.get('status', '')
                 
-                # Log full response for debugging
-                _logger.info(f"e-Transport response for {self.name}: {json.dumps(response_data, indent=2, default=str)}")
+                if debug_mode:
+                    _logger.debug("e-Transport response for %s: %s", self.name, _LazyJSON(response_data))
                 
                 if status in ('success', 'warning'):
                     # Get TMS ID from mapping if available
                     # e-Transport returns: {"mapping": {"orders": {"WH/OUT/00001": 4589}}}
                     mapping = response_data.get('mapping', {})
                     orders_mapping = mapping.get('orders', {})
-                    tms_id = orders_mapping.get(self.name)
-                    
-                    _logger.info(f"e-Transport mapping for {self.name}: mapping={mapping}, tms_id={tms_id}")
+                    tms_id = orders_mapping.get(external_ref)
                     
                     # Update 3PL fields - use TMS ID if available, otherwise use our reference
                     vals = {
-                        'x_3pl_order_id': str(tms_id) if tms_id else self.name,
-                        'x_3pl_status': 'sent'
+                        'x_3pl_order_id': str(tms_id) if tms_id else external_ref,
+                        'x_3pl_status': 'sent',
+                        'x_3pl_sent_leg_hash': self.partner_id.x_etransport_leg_hash,
+                        'x_3pl_state_changed_at': fields.Datetime.now(),
+                        'x_3pl_next_poll_at': self._3pl_compute_next_poll(),
+                        'x_3pl_update_pending': False,
+                        'x_3pl_update_due_at': False,
                     }
-                    self.write(vals)
+                    if len(members) == 1:
+                        vals['x_3pl_consolidation_ref'] = False
+                    members.write(vals)
+                    _lap('write')
                     
                     # Build message with details
                     msg_parts = []
@@ -441,6 +1243,8 @@ class StockPicking(models.Model):
                     
                     if tms_id:
                         msg_parts.append(_("TMS ID: %s") % tms_id)
+                    if len(members) > 1:
+                        msg_parts.append(_("Consolidated order %s (%s deliveries)") % (external_ref, len(members)))
                     
                     orders_created = response_data.get('orders_created', 0)
                     orders_updated = response_data.get('orders_updated', 0)
@@ -457,7 +1261,11 @@ class StockPicking(models.Model):
                     # Build message body
                     msg_body = ' | '.join(msg_parts)
                     
-                    self.message_post(body=msg_body)
+                    for member in members:
+                        member._3pl_message_post(body=msg_body)
+                    _lap('chatter')
+                    _log_sampled(_logger, self.env, "e-Transport %s of %s: %s, TMS ID %s (%.0f ms)",
+                                 send_kind, self.name, status, tms_id, duration_ms)
                     
                 else:
                     # Error status
@@ -470,33 +1278,509 @@ class StockPicking(models.Model):
                         error_msg += " | " + _("Warnings: %s") % ', '.join(warnings)
                     
                     self.write({'x_3pl_status': 'error'})
-                    self.message_post(body=error_msg)
-                    _logger.error(f"e-Transport Error for {self.name}: {json.dumps(response_data, indent=2, default=str)}")
+                    self._3pl_message_post(body=error_msg)
+                    _logger.error("e-Transport Error for %s: %s, errors=%s, warnings=%s",
+                                  self.name, status, errors, warnings)
                     raise UserError(_("e-Transport Error: %s") % status)
             else:
                 error_msg = _("❌ e-Transport API Error: HTTP %s") % response.status_code
                 self.write({'x_3pl_status': 'error'})
-                self.message_post(body=error_msg)
-                _logger.error(f"e-Transport API Error for {self.name}: {response.status_code} - {response.text}")
+                self._3pl_message_post(body=error_msg)
+                _logger.error("e-Transport API Error for %s: HTTP %s - %.500s",
+                              self.name, response.status_code, response.text)
                 raise UserError(_("e-Transport API Error: HTTP %s") % response.status_code)
                 
         except requests.exceptions.RequestException as e:
             error_msg = f"Connection Error: {str(e)}"
             self.write({'x_3pl_status': 'error'})
-            self.message_post(body=error_msg)
-            _logger.error(error_msg)
+            self._3pl_message_post(body=error_msg)
+            _logger.error("e-Transport connection error sending %s: %s", self.name, e)
             raise UserError(error_msg)
-    
+
+    @api.model
+    def _get_3pl_mass_send_domain(self):
+        """Domain matching pickings that can be queued for a background send."""
+        config = self.env['ir.config_parameter'].sudo()
+        target_warehouse_id = config.get_param('logistics_3pl_connector.warehouse_id')
+
+        domain = [
+            ('picking_type_code', '=', 'outgoing'),
+            ('state', '=', 'assigned'),
+            ('x_3pl_status', 'in', ('draft', 'error')),
+            ('x_3pl_queue_state', '!=', 'queued'),
+        ]
+        if target_warehouse_id:
+            try:
+                domain.append(('picking_type_id.warehouse_id', '=', int(target_warehouse_id)))
+            except (ValueError, TypeError):
+                _logger.warning("Invalid 3PL Warehouse ID in configuration.")
+                return [('id', '=', False)]
+        return domain
+
+    def _3pl_compute_lane(self):
+        """
+        Send lane of this delivery, from the most to the least pressing:
+
+        * urgent: starred, an urgent ServiceType (Urgent ServiceTypes setting)
+          or a delivery window starting within Urgent Window hours (or past)
+        * normal: web orders and deliveries due within a day
+        * bulk: everything else, e.g. backfills of future deliveries
+        """
+        self.ensure_one()
+        config = self.env['ir.config_parameter'].sudo()
+        urgent_services = {code.strip() for code in
+                           (config.get_param('logistics_3pl_connector.urgent_service_types') or '').split(',')
+                           if code.strip()}
+        try:
+            urgent_hours = float(config.get_param('logistics_3pl_connector.urgent_window_hours', 4) or 0)
+        except (TypeError, ValueError):
+            _logger.warning("Invalid 3PL Urgent Window in configuration, using 4 hours.")
+            urgent_hours = 4.0
+        if self.priority == '1' or self._get_etransport_service_type() in urgent_services:
+            return 'urgent'
+        now = fields.Datetime.now()
+        start = self._3pl_delivery_window()[0] or self.scheduled_date
+        if start and start <= now + timedelta(hours=urgent_hours):
+            return 'urgent'
+        if self.x_is_web_order or (start and start <= now + timedelta(days=1)):
+            return 'normal'
+        return 'bulk'
+
+    def _3pl_enqueue(self, batch):
+        """
+        Queue these deliveries in a send batch, each in its priority lane.
+
+        Deliveries consolidated in one e-Transport order share the most
+        pressing lane of the group, so they are not sent apart.
+        """
+        lane_rank = [lane for lane, _label in self._fields['x_3pl_lane'].selection]
+        lanes = collections.defaultdict(list)
+        for group in self._3pl_consolidation_groups():
+            lane = min((picking._3pl_compute_lane() for picking in group), key=lane_rank.index)
+            lanes[lane].extend(group.ids)
+        now = fields.Datetime.now()
+        for lane, ids in lanes.items():
+            self.browse(ids).write({
+                'x_3pl_batch_id': batch.id,
+                'x_3pl_queue_state': 'queued',
+                'x_3pl_lane': lane,
+                'x_3pl_queued_at': now,
+                'x_3pl_queue_wait': 0.0,
+            })
+
+    @api.model
+    def _3pl_next_to_send(self, limit):
+        """
+        Queued deliveries to send next, about limit, across every released batch.
+
+        Urgent work goes first, then work that waited longer than the Lane Max
+        Wait of its lane (starvation protection), then normal and bulk work;
+        first queued, first sent within each step. With consolidation, the
+        queued deliveries sharing an e-Transport order with the selected ones
+        are added (beyond limit if need be) so that no order is sent in pieces.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        max_wait = int(config.get_param('logistics_3pl_connector.lane_max_wait', 15) or 15)
+        order = 'x_3pl_queued_at, id'
+        base = [
+            ('x_3pl_queue_state', '=', 'queued'),
+            ('x_3pl_batch_id.state', 'in', ('queued', 'running')),
+        ]
+        aged_before = fields.Datetime.now() - timedelta(minutes=max_wait)
+        steps = [
+            ([('x_3pl_lane', '=', 'urgent')], order),
+            ([('x_3pl_queued_at', '<=', aged_before)], order),
+            ([('x_3pl_lane', '=', 'normal')], order),
+            ([('x_3pl_lane', 'in', ('bulk', False))], order),
+        ]
+        pickings = self.browse()
+        for domain, step_order in steps:
+            if len(pickings) >= limit:
+                break
+            pickings |= self.search(base + domain + [('id', 'not in', pickings.ids)],
+                                    order=step_order, limit=limit - len(pickings))
+
+        if pickings and config.get_param('logistics_3pl_connector.consolidate', 'False').lower() == 'true':
+            keys = {picking._3pl_consolidation_key() for picking in pickings} - {None}
+            siblings = self.search(base + [
+                ('partner_id', 'in', pickings.partner_id.ids), ('id', 'not in', pickings.ids),
+            ], order=order)
+            pickings |= siblings.filtered(lambda p: p._3pl_consolidation_key() in keys)
+        return pickings
+
+    @api.model
+    def _3pl_lane_stats(self):
+        """
+        Per-lane state of the send queue: depth, oldest wait and recent waits.
+
+        Returns ``{lane: {'depth', 'oldest_wait_s', 'sent_last_hour', 'avg_wait_s', 'max_wait_s'}}``;
+        waits of the last hour are measured from queueing to acceptance by e-Transport.
+        """
+        now = fields.Datetime.now()
+        stats = {lane: {'depth': 0, 'oldest_wait_s': 0, 'sent_last_hour': 0, 'avg_wait_s': 0, 'max_wait_s': 0}
+                 for lane in ('urgent', 'normal', 'bulk')}
+        for lane, count, oldest in self._read_group(
+                [('x_3pl_queue_state', '=', 'queued'), ('x_3pl_lane', '!=', False)],
+                ['x_3pl_lane'], ['__count', 'x_3pl_queued_at:min']):
+            stats[lane]['depth'] = count
+            stats[lane]['oldest_wait_s'] = round((now - oldest).total_seconds()) if oldest else 0
+        for lane, count, avg_wait, max_wait in self._read_group(
+                [('x_3pl_queue_state', '=', 'sent'), ('x_3pl_lane', '!=', False),
+                 ('x_3pl_state_changed_at', '>=', now - timedelta(hours=1))],
+                ['x_3pl_lane'], ['__count', 'x_3pl_queue_wait:avg', 'x_3pl_queue_wait:max']):
+            stats[lane].update(sent_last_hour=count, avg_wait_s=round(avg_wait or 0, 1),
+                               max_wait_s=round(max_wait or 0, 1))
+        return stats
+
+    def action_send_to_3pl_mass(self):
+        """
+        Queue the selected deliveries for a background send to e-Transport.
+
+        Pickings are filtered to the eligible ones with a single search and
+        attached to a new send batch; the batch cron posts them in chunks so the
+        user's request returns immediately.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        if not config.get_param('logistics_3pl_connector.api_url') or not config.get_param('logistics_3pl_connector.api_key'):
+            raise UserError(_("3PL API configuration is missing. Please check Inventory Settings."))
+
+        pickings = self.search([('id', 'in', self.ids)] + self._get_3pl_mass_send_domain())
+        if not pickings:
+            raise UserError(_("None of the selected transfers can be sent to e-Transport. "
+                              "Only Ready deliveries of the 3PL warehouse that were not sent yet (or failed) are eligible."))
+
+        batch = self.env['logistics.3pl.send.batch'].create({})
+        pickings._3pl_enqueue(batch)
+        self.env.ref('logistics_3pl_connector.ir_cron_3pl_send_batches')._trigger()
+        _logger.info("Queued %s of %s selected pickings for e-Transport in batch %s",
+                     len(pickings), len(self), batch.name)
+
+        return {
+            'type': 'ir.actions.act_window',
+            'name': batch.name,
+            'res_model': 'logistics.3pl.send.batch',
+            'res_id': batch.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    @api.model
+    def _3pl_send_chunks(self, chunks, max_workers=4):
+        """
+        Send several chunks of pickings to e-Transport, one import call per chunk.
+
+        Payloads are built and results applied in the current thread; only the
+        HTTP calls run concurrently so no cursor is shared between threads.
+        With consolidation enabled, the deliveries of a chunk that share a
+        destination and slot go out as one order (see _3pl_consolidation_groups).
+        Orders failing the local pre-flight check are marked failed, not sent.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        api_url = config.get_param('logistics_3pl_connector.api_url')
+        api_key = config.get_param('logistics_3pl_connector.api_key')
+        debug_mode = config.get_param('logistics_3pl_connector.debug_mode', 'False').lower() == 'true'
+        record_traffic = config.get_param('logistics_3pl_connector.record_traffic', 'False').lower() == 'true'
+        full_url = f"{api_url}/tms/import-data"
+        headers = {
+            'Content-Type': 'application/json',
+            'X-API-Key': api_key or '',
+        }
+
+        prepared = []
+        known = self._3pl_known_codes()
+        for chunk in chunks:
+            orders = []
+            valid = self.browse()
+            for group in chunk._3pl_consolidation_groups():
+                payload = group._prepare_etransport_payload()
+                # Orders e-Transport would reject stay off the network
+                issues = self._3pl_payload_issues(payload, known)
+                if issues:
+                    group._3pl_mark_batch_failed(_("Pre-flight check failed, not sent: %s") % '; '.join(issues))
+                    continue
+                group.write({'x_3pl_consolidation_ref': group[:1].name if len(group) > 1 else False})
+                orders.extend(payload['Orders'])
+                valid |= group
+            if orders:
+                prepared.append((valid, {'Orders': orders}))
+        if not prepared:
+            return
+
+        if not api_url or not api_key:
+            for chunk, _payload in prepared:
+                chunk._3pl_mark_batch_failed(_("3PL API configuration is missing."))
+            return
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(prepared))) as executor:
+            futures = [
+                executor.submit(_post_etransport_import, full_url, headers, payload)
+                for _chunk, payload in prepared
+            ]
+
+        for (chunk, payload), future in zip(prepared, futures):
+            error = future.exception()
+            if error:
+                _logger.error("e-Transport batch send failed for %s pickings: %s", len(chunk), error)
+                chunk._3pl_mark_batch_failed(_("Connection Error: %s") % error)
+                continue
+
+            response = future.result()
+            try:
+                response_data = response.json()
+            except ValueError:
+                response_data = None
+
+            if debug_mode:
+                _write_debug_log(
+                    method='POST',
+                    url=full_url,
+                    headers=headers,
+                    payload=payload,
+                    response_status=response.status_code,
+                    response_body=response_data if response_data is not None else response.text,
+                    picking_name=', '.join(chunk.mapped('name')),
+                )
+            if record_traffic:
+                _record_traffic('import', 'POST', full_url, payload, response.status_code,
+                                response_data if response_data is not None else response.text,
+                                response.elapsed.total_seconds() * 1000, ref=','.join(chunk.mapped('name')))
+
+            if response.status_code != 200 or not isinstance(response_data, dict):
+                chunk._3pl_mark_batch_failed(_("e-Transport API Error: HTTP %s") % response.status_code)
+                continue
+            chunk._3pl_apply_batch_response(response_data)
+
+    def _3pl_apply_batch_response(self, response_data):
+        """Apply a /tms/import-data response to the pickings sent in that call."""
+        status = response_data.get('status', '')
+        if status not in ('success', 'warning'):
+            errors = response_data.get('errors', [])
+            error_msg = _("e-Transport Error: %s") % status
+            if errors:
+                error_msg += " | " + _("Errors: %s") % ', '.join(errors)
+            self._3pl_mark_batch_failed(error_msg)
+            return
+
+        orders_mapping = response_data.get('mapping', {}).get('orders', {})
+        warnings = response_data.get('warnings', [])
+        missing = self.browse()
+        for picking in self:
+            external_ref = picking.x_3pl_consolidation_ref or picking.name
+            tms_id = orders_mapping.get(external_ref)
+            # An empty mapping means e-Transport did not report ids at all, which
+            # the single send path also accepts; a partial one means rejected orders.
+            if orders_mapping and not tms_id:
+                missing |= picking
+                continue
+            picking.write({
+                'x_3pl_order_id': str(tms_id) if tms_id else external_ref,
+                'x_3pl_status': 'sent',
+                'x_3pl_queue_state': 'sent',
+                'x_3pl_queue_wait': (fields.Datetime.now() - picking.x_3pl_queued_at).total_seconds()
+                                    if picking.x_3pl_queued_at else 0.0,
+                'x_3pl_sent_leg_hash': picking.partner_id.x_etransport_leg_hash,
+                'x_3pl_state_changed_at': fields.Datetime.now(),
+                'x_3pl_next_poll_at': picking._3pl_compute_next_poll(),
+            })
+            msg_parts = [_("📤 Sent to e-Transport (batch %s).") % picking.x_3pl_batch_id.name]
+            if picking.x_3pl_consolidation_ref:
+                msg_parts.append(_("Consolidated in order %s") % picking.x_3pl_consolidation_ref)
+            if tms_id:
+                msg_parts.append(_("TMS ID: %s") % tms_id)
+            if warnings:
+                msg_parts.append(_("⚠️ Warnings: %s") % ', '.join(warnings))
+            picking._3pl_message_post(body=' | '.join(msg_parts))
+
+        if missing:
+            missing._3pl_mark_batch_failed(_("e-Transport did not return a TMS ID for this order."))
+
+    def _3pl_mark_batch_failed(self, reason):
+        """Flag pickings of a send batch as failed and explain why in the chatter."""
+        # No e-Transport order was created: drop the consolidation set before the call
+        self.write({'x_3pl_status': 'error', 'x_3pl_queue_state': 'failed', 'x_3pl_consolidation_ref': False})
+        for picking in self:
+            picking._3pl_message_post(body=_("❌ Batch send to e-Transport failed: %s") % reason)
+
+    @api.model
+    def _3pl_update_fields(self):
+        """Delivery fields feeding _prepare_etransport_payload (the optional ones only with delivery_time_slots)."""
+        return {
+            name for name in ('partner_id', 'scheduled_delivery_date', 'delivery_time_slot_id')
+            if name in self._fields
+        }
+
+    def _3pl_mark_dirty(self):
+        """
+        Schedule a push of these deliveries to e-Transport after a change.
+
+        Only deliveries already sent (and not shipped yet) are concerned:
+        cancelled ones get a cancellation, the others an update. The push
+        happens one debounce window after the first change, so a burst of
+        edits produces a single update carrying the final values.
+        """
+        if not self:
+            return
+        config = self.env['ir.config_parameter'].sudo()
+        if config.get_param('logistics_3pl_connector.push_updates', 'False').lower() != 'true':
+            return
+        pickings = self.filtered(lambda p: p.x_3pl_status == 'sent' and p.state != 'done')
+        if not pickings:
+            return
+
+        debounce = int(config.get_param('logistics_3pl_connector.update_debounce', 60) or 0)
+        due = fields.Datetime.now() + timedelta(seconds=debounce)
+        cancelled = pickings.filtered(lambda p: p.state == 'cancel')
+        for action, records in (('cancel', cancelled), ('update', pickings - cancelled)):
+            records.filtered(lambda p: p.x_3pl_update_pending != action).write({'x_3pl_update_pending': action})
+        new = pickings.filtered(lambda p: not p.x_3pl_update_due_at)
+        if new:
+            new.write({'x_3pl_update_due_at': due})
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_push_updates')._trigger(due)
+
+    @api.model
+    def _cron_3pl_push_updates(self, limit=500):
+        """
+        Push the pending changes of sent deliveries to e-Transport.
+
+        Updates and cancellations go through /tms/import-data, which upserts
+        orders by ExternalRef: every due order is rebuilt from the current data
+        and sent in chunks of Batch Chunk Size orders per call, the calls
+        running concurrently like background sends. A consolidated order is
+        pushed once for all its deliveries, and only cancelled once all of them
+        are cancelled.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        api_url = config.get_param('logistics_3pl_connector.api_url')
+        api_key = config.get_param('logistics_3pl_connector.api_key')
+        chunk_size = max(int(config.get_param('logistics_3pl_connector.batch_chunk_size', 50) or 50), 1)
+        workers = max(int(config.get_param('logistics_3pl_connector.batch_workers', 4) or 4), 1)
+        debug_mode = _is_debug_mode(self.env)
+        record_traffic = config.get_param('logistics_3pl_connector.record_traffic', 'False').lower() == 'true'
+        if not api_url or not api_key:
+            return
+        full_url = f"{api_url}/tms/import-data"
+        headers = {'Content-Type': 'application/json', 'X-API-Key': api_key}
+
+        now = fields.Datetime.now()
+        due = self.search([('x_3pl_update_due_at', '<=', now)], order='x_3pl_update_due_at', limit=limit)
+        available = due._3pl_lock_available()
+        if len(available) < len(due):
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_push_updates')._trigger(now + timedelta(seconds=30))
+
+        # Shipped / delivered meanwhile: nothing left to update
+        stale = available.filtered(lambda p: p.x_3pl_status != 'sent' or p.state == 'done')
+        stale.write({'x_3pl_update_pending': False, 'x_3pl_update_due_at': False})
+
+        orders = []
+        seen = set()
+        known = self._3pl_known_codes()
+        for picking in available - stale:
+            ref = picking.x_3pl_consolidation_ref or picking.name
+            if ref in seen:
+                continue
+            seen.add(ref)
+            members = picking._3pl_consolidated_members()
+            if len(members) > 1 and len(members._3pl_lock_available()) < len(members):
+                continue
+            payload = members._prepare_etransport_payload()
+            if all(member.state == 'cancel' for member in members):
+                action = 'cancel'
+                for order in payload['Orders']:
+                    order['Cancelled'] = True
+            else:
+                action = 'update'
+                issues = self._3pl_payload_issues(payload, known)
+                if issues:
+                    # e-Transport keeps the old data: leave the deliveries marked
+                    # as out of sync, without a due date, until the next edit
+                    # schedules a new push (see _3pl_mark_dirty)
+                    members.write({'x_3pl_update_pending': 'update', 'x_3pl_update_due_at': False})
+                    for member in members:
+                        member._3pl_message_post(body=_(
+                            "❌ Update not sent to e-Transport, it would be rejected: %s. "
+                            "e-Transport still has the previous data; fix the delivery to push it again."
+                        ) % '; '.join(issues))
+                    continue
+            orders.append((members, action, payload['Orders'][0]))
+        if not orders:
+            return
+
+        chunks = list(split_every(chunk_size, orders))
+        with ThreadPoolExecutor(max_workers=min(workers, len(chunks))) as executor:
+            futures = [
+                executor.submit(_post_etransport_import, full_url, headers,
+                                {'Orders': [order for _members, _action, order in chunk]})
+                for chunk in chunks
+            ]
+
+        odoobot = self.env.ref('base.partner_root', raise_if_not_found=False)
+        for chunk, future in zip(chunks, futures):
+            pickings = self.concat(*(members for members, _action, _order in chunk))
+            error = future.exception()
+            response = None if error else future.result()
+            try:
+                response_data = response.json() if response is not None else None
+            except ValueError:
+                response_data = None
+            if response is not None and (debug_mode or record_traffic):
+                payload = {'Orders': [order for _members, _action, order in chunk]}
+                body = response_data if response_data is not None else response.text
+                if debug_mode:
+                    _write_debug_log('POST', full_url, headers, payload, response.status_code, body,
+                                     picking_name=', '.join(pickings.mapped('name')))
+                if record_traffic:
+                    _record_traffic('import', 'POST', full_url, payload, response.status_code, body,
+                                    response.elapsed.total_seconds() * 1000, ref=','.join(pickings.mapped('name')))
+
+            if (error or response.status_code != 200 or not isinstance(response_data, dict)
+                    or response_data.get('status') not in ('success', 'warning')):
+                # Keep the changes pending and retry later
+                _logger.warning("e-Transport update of %s orders failed: %s", len(chunk),
+                                error or (response_data or {}).get('errors') or f"HTTP {response.status_code}")
+                pickings.write({'x_3pl_update_due_at': fields.Datetime.now() + timedelta(minutes=5)})
+                self.env.ref('logistics_3pl_connector.ir_cron_3pl_push_updates')._trigger(
+                    fields.Datetime.now() + timedelta(minutes=5))
+                continue
+
+            bodies = {}
+            for members, action, _order in chunk:
+                if action == 'cancel':
+                    members.write({'x_3pl_update_pending': False, 'x_3pl_update_due_at': False,
+                                   'x_3pl_next_poll_at': False})
+                    body = _("🚫 Cancellation sent to e-Transport.")
+                else:
+                    for member in members:
+                        member.write({'x_3pl_update_pending': False, 'x_3pl_update_due_at': False,
+                                      'x_3pl_sent_leg_hash': member.partner_id.x_etransport_leg_hash})
+                    body = _("🔄 Changes sent to e-Transport.")
+                bodies.update(dict.fromkeys(members.ids, body))
+            self.browse(list(bodies))._3pl_message_log_batch(bodies=bodies, author_id=odoobot.id if odoobot else None)
+            _log_sampled(_logger, self.env, "e-Transport: pushed %s order updates/cancellations", len(chunk))
+        self.env.cr.commit()
+
+        if len(due) == limit:
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_push_updates')._trigger()
+
+    @_timed('tracking')
     def action_fetch_tracking(self):
         """
         Manually fetch tracking status from e-Transport TMS.
         Uses GET /tms/tracking/{external_ref} endpoint.
+
+        For a consolidated order the result is applied to every delivery of it.
         """
         self.ensure_one()
         
         if self.x_3pl_status not in ('sent', 'shipped'):
             raise UserError(_("Tracking is only available for orders that have been sent to e-Transport."))
         
+        members = self._3pl_consolidated_members()
+        if not members._3pl_try_lock():
+            raise UserError(_(
+                "This delivery is being updated by another operation (e-Transport send or webhook). "
+                "Please try again in a few seconds."
+            ))
+        
         config = self.env['ir.config_parameter'].sudo()
         api_url = config.get_param('logistics_3pl_connector.api_url')
         api_key = config.get_param('logistics_3pl_connector.api_key')
@@ -509,8 +1793,9 @@ class StockPicking(models.Model):
             'X-API-Key': api_key
         }
         
-        # Use the picking name as external_ref (same as what we sent)
-        external_ref = self.name
+        # Use the picking name (or consolidated order ref) as external_ref (same as what we sent)
+        external_ref = self.x_3pl_consolidation_ref or self.name
+        _lap('checks')
         
         try:
             full_url = f"{api_url}/tms/tracking/{external_ref}"
@@ -519,23 +1804,28 @@ class StockPicking(models.Model):
                 'include_packs': 'true',
                 'traceability_limit': 10
             }
-            _logger.info(f"Fetching tracking for {external_ref} from e-Transport")
+            _logger.debug("Fetching tracking for %s from e-Transport", external_ref)
             
+            started = time.monotonic()
             response = requests.get(
                 full_url,
                 headers=headers,
                 params=params,
                 timeout=15
             )
+            duration_ms = (time.monotonic() - started) * 1000
+            _lap('http')
             
-            # Write debug log if enabled
+            # Write debug log / traffic capture if enabled
             debug_mode = config.get_param('logistics_3pl_connector.debug_mode', 'False').lower() == 'true'
-            if debug_mode:
+            record_traffic = config.get_param('logistics_3pl_connector.record_traffic', 'False').lower() == 'true'
+            if debug_mode or record_traffic:
                 try:
                     response_data_for_log = response.json()
                 except Exception:
                     response_data_for_log = response.text
-                _write_debug_log(
+            if debug_mode:
+                _queue_debug_log(
                     method='GET',
                     url=f"{full_url}?{requests.compat.urlencode(params)}",
                     headers=headers,
@@ -544,6 +1834,10 @@ class StockPicking(models.Model):
                     response_body=response_data_for_log,
                     picking_name=self.name
                 )
+            if record_traffic:
+                _record_traffic('tracking', 'GET', f"{full_url}?{requests.compat.urlencode(params)}", None,
+                                response.status_code, response_data_for_log, duration_ms, ref=self.name)
+            _lap('log')
             
             if response.status_code == 200:
                 data = response.json()
@@ -556,6 +1850,9 @@ class StockPicking(models.Model):
                 vals = {
                     'x_3pl_current_state': current_state,
                 }
+                state_changed = current_state != (self.x_3pl_current_state or '')
+                if state_changed:
+                    vals['x_3pl_state_changed_at'] = fields.Datetime.now()
                 
                 # Update status based on e-Transport state
                 state_lower = current_state.lower() if current_state else ''
@@ -570,7 +1867,19 @@ class StockPicking(models.Model):
                         tracking_url_base += '/'
                     vals['x_3pl_tracking_url'] = f"{tracking_url_base}{external_ref}"
                 
-                self.write(vals)
+                # Schedule the next automatic poll from the reported ETA / window
+                if vals.get('x_3pl_status', self.x_3pl_status) in ('sent', 'shipped'):
+                    vals['x_3pl_next_poll_at'] = self._3pl_compute_next_poll(
+                        eta=eta, time_range=time_range, date=data.get('date'),
+                        state_changed_at=vals.get('x_3pl_state_changed_at') or self.x_3pl_state_changed_at,
+                    )
+                
+                members.write(vals)
+                _lap('write')
+                
+                # Automatic polls only leave a trace in the chatter when something changed
+                if self.env.context.get('3pl_tracking_poll') and not state_changed:
+                    return
                 
                 # Build message with tracking info
                 msg_parts = [_("📍 Tracking updated from e-Transport")]
@@ -593,7 +1902,9 @@ class StockPicking(models.Model):
                             event_line += f" ({location})"
                         msg_parts.append(event_line)
                 
-                self.message_post(body='<br/>'.join(msg_parts))
+                for member in members:
+                    member._3pl_message_post(body='<br/>'.join(msg_parts))
+                _lap('chatter')
                 
                 # If delivered, offer to validate the picking
                 if vals.get('x_3pl_status') == 'delivered' and self.state == 'waiting_3pl':
@@ -609,20 +1920,288 @@ class StockPicking(models.Model):
                     }
                     
             elif response.status_code == 404:
-                self.message_post(body=_(
+                members.x_3pl_next_poll_at = self._3pl_compute_next_poll(state_changed_at=self.x_3pl_state_changed_at)
+                if self.env.context.get('3pl_tracking_poll'):
+                    return
+                self._3pl_message_post(body=_(
                     "⚠️ Order %s not found in e-Transport. It may not have been processed yet."
                 ) % external_ref)
             else:
                 error_msg = f"e-Transport Tracking Error: {response.status_code} - {response.text}"
-                self.message_post(body=error_msg)
+                members.x_3pl_next_poll_at = self._3pl_compute_next_poll(state_changed_at=self.x_3pl_state_changed_at)
+                if not self.env.context.get('3pl_tracking_poll'):
+                    self._3pl_message_post(body=error_msg)
                 _logger.warning(error_msg)
                 
         except requests.exceptions.RequestException as e:
             error_msg = f"Connection Error fetching tracking: {str(e)}"
-            self.message_post(body=error_msg)
+            self._3pl_message_post(body=error_msg)
             _logger.error(error_msg)
             raise UserError(error_msg)
-    
+
+    def _3pl_local_tz(self):
+        """Timezone of the warehouse operations: the company's, else the user's, else UTC."""
+        tz_name = self.env.company.partner_id.tz or self.env.user.tz or 'UTC'
+        try:
+            return ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            return timezone.utc
+
+    def _3pl_local_to_utc(self, value):
+        """Convert a naive local datetime (or an aware one) to naive UTC for Datetime fields."""
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=self._3pl_local_tz())
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _3pl_delivery_window(self, time_range=None, date=None):
+        """
+        Return the expected delivery window as naive UTC ``(start, end)``, or ``(None, None)``.
+
+        Uses the ``time_range``/``date`` reported by e-Transport tracking when
+        available, otherwise the picking's scheduled_delivery_date and
+        delivery_time_slot_id (delivery_time_slots module).
+        """
+        delivery_date = None
+        if date:
+            try:
+                delivery_date = datetime.fromisoformat(str(date)[:10]).date()
+            except ValueError:
+                delivery_date = None
+        if not delivery_date and getattr(self, 'scheduled_delivery_date', False):
+            delivery_date = fields.Date.to_date(self.scheduled_delivery_date)
+        if not delivery_date:
+            return None, None
+
+        start_hour = end_hour = None
+        if time_range and '-' in time_range:
+            try:
+                start_str, end_str = [part.strip() for part in time_range.split('-', 1)]
+                start_h, start_m = (int(x) for x in start_str.split(':'))
+                end_h, end_m = (int(x) for x in end_str.split(':'))
+                start_hour, end_hour = start_h + start_m / 60.0, end_h + end_m / 60.0
+            except ValueError:
+                start_hour = end_hour = None
+        if start_hour is None and getattr(self, 'delivery_time_slot_id', False):
+            slot = self.delivery_time_slot_id
+            if getattr(slot, 'start_hour', None) is not None and getattr(slot, 'end_hour', None) is not None:
+                start_hour, end_hour = slot.start_hour, slot.end_hour
+        if start_hour is None:
+            # Whole day
+            start_hour, end_hour = 0.0, 24.0
+
+        day = datetime.combine(delivery_date, datetime.min.time())
+        return (
+            self._3pl_local_to_utc(day + timedelta(hours=start_hour)),
+            self._3pl_local_to_utc(day + timedelta(hours=end_hour)),
+        )
+
+    def _3pl_compute_next_poll(self, eta=None, time_range=None, date=None, state_changed_at=None):
+        """
+        Decide when the tracking poller should query e-Transport again.
+
+        Polls get denser as the ETA / delivery window approaches (a third of the
+        remaining time), run at the minimum interval inside the window and back
+        off afterwards, or, with no window at all, as the e-Transport state stays
+        unchanged. The interval is always kept between the configured bounds.
+        """
+        self.ensure_one()
+        config = self.env['ir.config_parameter'].sudo()
+        min_interval = timedelta(minutes=int(config.get_param('logistics_3pl_connector.poll_min_interval', 10) or 10))
+        max_interval = timedelta(minutes=int(config.get_param('logistics_3pl_connector.poll_max_interval', 240) or 240))
+        now = fields.Datetime.now()
+
+        window_start, window_end = self._3pl_delivery_window(time_range=time_range, date=date)
+        target = window_start
+        if eta:
+            try:
+                target = self._3pl_local_to_utc(datetime.fromisoformat(str(eta)))
+                window_end = max(window_end or target, target + timedelta(hours=1))
+            except ValueError:
+                _logger.debug("Unparseable e-Transport ETA %r for %s", eta, self.name)
+
+        if target and now < target:
+            interval = (target - now) / 3
+        elif target and window_end and now <= window_end:
+            interval = min_interval
+        elif target:
+            interval = (now - (window_end or target)) / 2
+        else:
+            interval = (now - (state_changed_at or now)) / 2
+
+        return now + min(max(interval, min_interval), max_interval)
+
+    @api.model
+    def _cron_poll_tracking(self, limit=None):
+        """Fetch tracking for the in-flight pickings whose next poll is due."""
+        config = self.env['ir.config_parameter'].sudo()
+        if config.get_param('logistics_3pl_connector.tracking_poll', 'False').lower() != 'true':
+            return
+        limit = limit or int(config.get_param('logistics_3pl_connector.poll_batch_size', 200) or 200)
+
+        # Served by the partial index on x_3pl_next_poll_at (only in-flight rows are set)
+        due = self.search([('x_3pl_next_poll_at', '<=', fields.Datetime.now())],
+                          order='x_3pl_next_poll_at', limit=limit)
+        polled_refs = set()
+        for picking in due:
+            # One poll covers every delivery of a consolidated order
+            if picking.x_3pl_consolidation_ref in polled_refs:
+                continue
+            # Each commit below releases the row locks: lock every picking
+            # only when its turn comes, and skip it (until the next run) while
+            # a send or webhook is working on it
+            if not picking._3pl_try_lock():
+                continue
+            picking.invalidate_recordset()
+            if picking.x_3pl_consolidation_ref:
+                polled_refs.add(picking.x_3pl_consolidation_ref)
+            if picking.x_3pl_status not in ('sent', 'shipped') or picking.state == 'cancel':
+                picking.x_3pl_next_poll_at = False
+            else:
+                try:
+                    with self.env.cr.savepoint():
+                        picking.with_context(**{'3pl_tracking_poll': True}).action_fetch_tracking()
+                except Exception as e:
+                    _logger.warning("Tracking poll failed for %s: %s", picking.name, e)
+                    picking.x_3pl_next_poll_at = picking._3pl_compute_next_poll(
+                        state_changed_at=picking.x_3pl_state_changed_at)
+            self.env.cr.commit()
+
+        if len(due) == limit:
+            self.env.ref('logistics_3pl_connector.ir_cron_3pl_poll_tracking')._trigger()
+
+    @api.model
+    def _cron_3pl_retention(self, batch_size=200, time_limit=240):
+        """
+        Apply the retention policies to the data the connector accumulates.
+
+        * debug log and traffic capture: rotated once over the size limit
+        * slow request profiles: deleted after the profile retention
+        * deferred events already done or failed: deleted after the event retention
+        * connector chatter notes on deliveries: after the message retention,
+          replaced by one summary note per delivery (or deleted)
+
+        Work is committed in small batches; when the time limit is reached the
+        cron is triggered again to carry on.
+        """
+        config = self.env['ir.config_parameter'].sudo()
+        deadline = time.monotonic() + time_limit
+
+        def param(key, default):
+            try:
+                return int(config.get_param(f'logistics_3pl_connector.{key}', default) or 0)
+            except ValueError:
+                return default
+
+        max_bytes = param('log_max_mb', 50) * 1024 * 1024
+        if max_bytes:
+            backups = param('log_backups', 5)
+            for path in (_get_debug_log_path(), _get_debug_log_path(TRAFFIC_LOG_PATHS)):
+                if _rotate_file(path, max_bytes, backups):
+                    _logger.info("3PL retention: rotated %s", path)
+
+        profile_days = param('retention_profile_days', 14)
+        if profile_days:
+            for profile_dir in PROFILE_DIRS:
+                removed = _prune_dir(profile_dir, profile_days)
+                if removed:
+                    _logger.info("3PL retention: removed %s profiles from %s", removed, profile_dir)
+
+        event_days = param('retention_event_days', 30)
+        if event_days:
+            Event = self.env['logistics.3pl.event'].sudo()
+            event_domain = [
+                ('state', 'in', ('done', 'failed')),
+                ('create_date', '<', fields.Datetime.now() - timedelta(days=event_days)),
+            ]
+            while events := Event.search(event_domain, limit=batch_size * 5):
+                events.unlink()
+                self.env.cr.commit()
+                if time.monotonic() > deadline:
+                    self.env.ref('logistics_3pl_connector.ir_cron_3pl_retention')._trigger()
+                    return
+
+        message_days = param('retention_message_days', 0)
+        if not message_days:
+            return
+        compact = config.get_param('logistics_3pl_connector.retention_message_mode', 'compact') != 'delete'
+        Message = self.env['mail.message'].sudo()
+        # Connector notes carry their own subtype; the summaries are plain notes
+        message_domain = [
+            ('model', '=', self._name),
+            ('subtype_id', '=', self.env.ref('logistics_3pl_connector.mt_3pl_update').id),
+            ('date', '<', fields.Datetime.now() - timedelta(days=message_days)),
+        ]
+        note_subtype = self.env.ref('mail.mt_note')
+        odoobot = self.env.ref('base.partner_root', raise_if_not_found=False)
+
+        while time.monotonic() < deadline:
+            # One batch covers every old note of its deliveries, so each gets a single summary
+            groups = Message._read_group(message_domain, ['res_id'], ['id:array_agg'], limit=batch_size)
+            if not groups:
+                return
+            messages = Message.browse(sorted(message_id for _res_id, ids in groups for message_id in ids))
+            if compact:
+                messages.fetch(['res_id', 'date', 'body'])
+                summaries = []
+                for res_id, ids in groups:
+                    picking_messages = Message.browse(sorted(ids))
+                    lines = [
+                        Markup("<li>%s: %s</li>") % (
+                            fields.Datetime.to_string(message.date),
+                            html2plaintext(message.body or '').replace('\n', ' ')[:300],
+                        )
+                        for message in picking_messages[:RETENTION_SUMMARY_MAX_LINES]
+                    ]
+                    if len(picking_messages) > RETENTION_SUMMARY_MAX_LINES:
+                        lines.append(Markup("<li>%s</li>") % _(
+                            "... and %s more", len(picking_messages) - RETENTION_SUMMARY_MAX_LINES))
+                    summaries.append({
+                        'model': self._name,
+                        'res_id': res_id,
+                        'message_type': 'notification',
+                        'subtype_id': note_subtype.id,
+                        'author_id': odoobot.id if odoobot else False,
+                        'date': max(picking_messages.mapped('date')),
+                        'body': Markup("<p>%s</p><ul>%s</ul>") % (
+                            _("%(marker)s: %(count)s notes compacted",
+                              marker=RETENTION_SUMMARY_MARKER, count=len(picking_messages)),
+                            Markup().join(lines),
+                        ),
+                    })
+                Message.create(summaries)
+            messages.unlink()
+            self.env.cr.commit()
+            _logger.info("3PL retention: %s %s chatter notes of %s deliveries",
+                         'compacted' if compact else 'deleted', len(messages), len(groups))
+            Message.invalidate_model()
+
+        self.env.ref('logistics_3pl_connector.ir_cron_3pl_retention')._trigger()
+
+    def write(self, vals):
+        # Orders that are no longer in flight leave the tracking poll schedule
+        if vals.get('x_3pl_status') in ('draft', 'delivered', 'error'):
+            vals = dict(vals, x_3pl_next_poll_at=False)
+        res = super().write(vals)
+        if 'x_3pl_status' in vals:
+            self._3pl_apply_hold()
+        if not self._3pl_update_fields().isdisjoint(vals):
+            self._3pl_mark_dirty()
+        return res
+
+    def _3pl_apply_hold(self):
+        """
+        Put deliveries sent to e-Transport on hold (waiting_3pl), lift the hold of the others.
+
+        Held deliveries get the state directly; only the released ones have
+        their state recomputed from their moves.
+        """
+        hold = self.filtered(lambda p: p.x_3pl_status == 'sent' and p.state not in ('done', 'cancel', 'waiting_3pl'))
+        release = self.filtered(lambda p: p.x_3pl_status != 'sent' and p.state == 'waiting_3pl')
+        if hold:
+            hold.write({'state': 'waiting_3pl'})
+        if release:
+            self.env.add_to_compute(self._fields['state'], release)
+
     def button_validate(self):
         """Override to handle auto-send to 3PL and block validation when waiting for 3PL confirmation."""
         # If skip_3pl_check is True (from webhook or force validate), skip all 3PL logic
@@ -638,12 +2217,19 @@ class StockPicking(models.Model):
         auto_send = config.get_param('logistics_3pl_connector.auto_send', 'False').lower() == 'true'
         web_only = config.get_param('logistics_3pl_connector.web_orders_only', 'False').lower() == 'true'
         
+        wave_mode = config.get_param('logistics_3pl_connector.wave_mode', 'False').lower() == 'true'
+        
         pickings_sent_to_3pl = self.browse()  # Track pickings successfully sent to 3PL
+        pickings_to_wave = self.browse()  # Eligible pickings left for the next wave
         
         for picking in self:
             # Block validation if waiting for 3PL
             if picking.state == 'waiting_3pl':
                 raise UserError(_("This delivery is waiting for 3PL confirmation. Use 'Force Validate' to override."))
+            if picking.x_3pl_queue_state == 'queued':
+                raise UserError(_("%s is queued for e-Transport in %s and will be sent with it. "
+                                  "Use 'Force Validate' to take it out of the batch and validate it now.")
+                                % (picking.name, picking.x_3pl_batch_id.name))
             
             # Auto-send conditions
             is_eligible_for_auto_send = (
@@ -655,9 +2241,14 @@ class StockPicking(models.Model):
             
             # Apply web-only filter if enabled
             if is_eligible_for_auto_send and web_only and not picking.x_is_web_order:
-                _logger.debug(f"Skipping auto-send for {picking.name}: web_orders_only is enabled and this is not a web order")
+                _logger.debug("Skipping auto-send for %s: web_orders_only is enabled and this is not a web order", picking.name)
                 is_eligible_for_auto_send = False
             
+            # Waves: collected and sent at the next cutoff, unless the delivery is urgent (starred)
+            if is_eligible_for_auto_send and wave_mode and picking.priority != '1':
+                pickings_to_wave |= picking
+                continue
+            
             # Auto-send to 3PL if eligible
             if is_eligible_for_auto_send:
                 try:
@@ -665,12 +2256,20 @@ class StockPicking(models.Model):
                     # If successful, picking state changed to 'waiting_3pl', don't validate
                     pickings_sent_to_3pl |= picking
                 except Exception as e:
-                    _logger.warning(f"Auto-send to 3PL failed for {picking.name}: {e}")
+                    _logger.warning("Auto-send to 3PL failed for %s: %s", picking.name, e)
                     # Continue with validation even if auto-send fails
         
+        if pickings_to_wave:
+            self.env['logistics.3pl.send.batch']._wave_enqueue(pickings_to_wave)
+            pickings_sent_to_3pl |= pickings_to_wave
+        
         # Only validate pickings that were NOT sent to 3PL (or failed to send)
         # Filter out pickings that are now in 'waiting_3pl' state (successfully sent to 3PL)
-        pickings_to_validate = self.filtered(lambda p: p.id not in pickings_sent_to_3pl.ids or p.state != 'waiting_3pl')
+        # and the ones waiting for their wave
+        pickings_to_validate = self.filtered(
+            lambda p: p not in pickings_to_wave
+            and (p.id not in pickings_sent_to_3pl.ids or p.state != 'waiting_3pl')
+        )
         
         if pickings_sent_to_3pl:
             # Some pickings were sent to 3PL and are now in 'waiting_3pl' state
@@ -690,10 +2289,33 @@ class StockPicking(models.Model):
         """
         Force validate a picking that is waiting for 3PL (manual override).
         Uses the same context flags as webhook auto-validation to skip wizards.
+
+        A delivery still queued in a send batch or wave is taken out of it
+        first, so it is validated without being sent to e-Transport.
         """
         self.ensure_one()
-        if self.state != 'waiting_3pl':
-            raise UserError(_("This action is only available for pickings waiting for 3PL."))
+        if self.x_3pl_queue_state == 'queued':
+            # The batch sender may be sending it right now
+            if not self._3pl_try_lock():
+                raise UserError(_(
+                    "This delivery is being sent to e-Transport by its batch. "
+                    "Please try again in a few seconds."
+                ))
+            self.invalidate_recordset()
+        if self.x_3pl_queue_state == 'queued':
+            batch = self.x_3pl_batch_id
+            self.write({
+                'x_3pl_batch_id': False,
+                'x_3pl_queue_state': False,
+                'x_3pl_lane': False,
+                'x_3pl_queued_at': False,
+            })
+            self._3pl_message_post(
+                body=_("Removed from e-Transport batch %s and validated without sending it to e-Transport.", batch.name),
+                message_type='notification',
+            )
+        elif self.state != 'waiting_3pl':
+            raise UserError(_("This action is only available for pickings waiting for 3PL or queued for it."))
         
         # Use the same context flags as webhook auto-validation to:
         # - skip_3pl_check: bypass our 3PL blocking logic
@@ -709,3 +2331,460 @@ class StockPicking(models.Model):
             'button_validate_picking_ids': self.ids,
         }
         return self.with_context(**validate_ctx).button_validate()
+
+    @api.model
+    def _3pl_status_lookup(self, refs):
+        """
+        Stored 3PL status of the deliveries matching some order references.
+
+        Used by the status API: a reference matches an outgoing picking by name
+        (WH/OUT/00001) or by origin (sale order name, possibly several
+        deliveries). Only stored fields are read; e-Transport is never called.
+        Returns ``{ref: [status dict, ...]}``, with an empty list for unknown refs.
+        """
+        found = {ref: [] for ref in refs}
+        if not found:
+            return found
+        refs = list(found)
+        pickings = self.sudo().search_fetch(
+            [('picking_type_code', '=', 'outgoing'), '|', ('name', 'in', refs), ('origin', 'in', refs)],
+            ['name', 'origin', 'state', 'x_3pl_status', 'x_3pl_current_state',
+             'x_3pl_tracking_ref', 'x_3pl_tracking_url'],
+            order='id',
+        )
+        for picking in pickings:
+            entry = {
+                'picking': picking.name,
+                'origin': picking.origin or None,
+                'state': picking.state,
+                'status': picking.x_3pl_status,
+                'current_state': picking.x_3pl_current_state or None,
+                'tracking_ref': picking.x_3pl_tracking_ref or None,
+                'tracking_url': picking.x_3pl_tracking_url or None,
+            }
+            for ref in {picking.name, picking.origin}:
+                if ref in found:
+                    found[ref].append(entry)
+        return found
+
+    @api.model
+    def _3pl_status_refs(self, order_ref):
+        """
+        References the status API may have cached an order under.
+
+        These are the names and origins (sale orders) of every delivery the
+        order covers, see _3pl_status_lookup.
+        """
+        picking = self.sudo().search([('name', '=', order_ref)], limit=1)
+        pickings = picking._3pl_consolidated_members() if picking else picking
+        return {order_ref, *pickings.mapped('name'), *filter(None, pickings.mapped('origin'))}
+
+    @api.model
+    def _3pl_handle_webhook(self, data, defer_on_conflict=True, max_validations=0):
+        """
+        Apply a 3PL status webhook to its picking.
+
+        Shared by the webhook controller and the deferred event queue, see
+        logistics.3pl.event. Returns an ``(http_status, body)`` tuple.
+
+        Args:
+            data: Parsed webhook payload (order_id, tracking_number, tracking_url, status)
+            defer_on_conflict: Queue the event when the picking is locked by a
+                concurrent transaction instead of answering 409
+            max_validations: When set, at most this many auto-validations run
+                at once across all workers; the others are queued as events
+        """
+        order_ref = data.get('order_id')
+        tracking_ref = data.get('tracking_number')
+        tracking_url = data.get('tracking_url')
+        status = data.get('status')
+
+        if not order_ref:
+            return 400, {'status': 'error', 'message': 'Missing order_id'}
+
+        # Validate status if provided
+        if status:
+            allowed_statuses = WEBHOOK_STATUSES
+            status_lower = status.lower()
+            if status_lower not in allowed_statuses:
+                _logger.warning("3PL Webhook: Invalid status '%s' for order %s. Allowed statuses: %s", status, order_ref, allowed_statuses)
+                return 400, {
+                    'status': 'error',
+                    'message': f'Invalid status "{status}". Allowed statuses are: {", ".join(allowed_statuses)}'
+                }
+
+        # 2. Find the Picking
+        picking = self.env['stock.picking'].sudo().search([('name', '=', order_ref)], limit=1)
+        _logger.debug("3PL Webhook: Found picking: %s", picking.name if picking else None)
+        _lap('lookup')
+
+        if not picking:
+            return 404, {'status': 'error', 'message': f'Order {order_ref} not found'}
+
+        # A consolidated order is known to the 3PL by its lead delivery's name:
+        # apply the update to every delivery sent in it
+        pickings = picking
+        if picking.x_3pl_consolidation_ref == order_ref:
+            pickings = picking._3pl_consolidated_members()
+
+        # 2.1. Serialize concurrent updates of the same picking: take its row
+        # lock without waiting; if a send or another webhook holds it, queue the
+        # event instead of blocking (and later failing with a serialization error)
+        if defer_on_conflict and self.env['logistics.3pl.event']._has_pending(order_ref):
+            # Keep arrival order behind events already waiting for this picking
+            return self.env['logistics.3pl.event']._defer(order_ref, data)
+        if not pickings._3pl_try_lock():
+            if not defer_on_conflict:
+                return 409, {'status': 'error', 'message': f'Order {order_ref} is locked by another operation'}
+            return self.env['logistics.3pl.event']._defer(order_ref, data)
+        _lap('lock')
+
+        # 2.1. Validate picking state - only allow updates for pickings in valid states
+        allowed_states = WEBHOOK_PICKING_STATES
+        skipped = pickings.filtered(lambda p: p.state not in allowed_states)
+        if skipped == pickings:
+            _logger.warning("3PL Webhook: Rejected update for %s - picking is in state '%s', allowed states: %s",
+                            order_ref, picking.state, allowed_states)
+            return 400, {
+                'status': 'error', 
+                'message': f'Order {order_ref} is in state "{picking.state}". Updates are only allowed for pickings in states: {", ".join(allowed_states)}'
+            }
+        if skipped:
+            _logger.info("3PL Webhook: %s - skipping consolidated deliveries %s (state not allowed)",
+                         order_ref, ', '.join(skipped.mapped('name')))
+            pickings -= skipped
+
+        # 3. Update Picking
+        # IMPORTANT: Save the current state BEFORE writing updates
+        # Because changing x_3pl_status lifts the waiting_3pl hold (see _3pl_apply_hold)
+        to_validate = pickings.filtered(lambda p: p.state == 'waiting_3pl') if (
+            status and status.lower() == 'shipped'
+        ) else pickings.browse()
+        _logger.debug("3PL Webhook: %s - states=%s, auto_validate=%s",
+                      order_ref, pickings.mapped('state'), to_validate.mapped('name'))
+
+        # 2.2. Auto-validation (button_validate) costs far more than a status
+        # write: when the validation slots are taken, leave the whole update to
+        # the event queue instead of holding one more HTTP worker
+        if to_validate and max_validations and defer_on_conflict and _try_advisory_slot(
+                self.env.cr, WEBHOOK_VALIDATION_SLOT_LOCK, max_validations) is None:
+            return self.env['logistics.3pl.event']._defer(order_ref, data, reason='busy')
+
+        vals, tracking_url = self._3pl_update_vals(status, tracking_ref, tracking_url)
+
+        if vals:
+            pickings.write(vals)
+            _lap('write')
+
+            # Use OdooBot or admin user for message_post since auth='none' has no user
+            odoobot = self.env.ref('base.partner_root', raise_if_not_found=False)
+            msg_body = self._3pl_update_message(status, tracking_ref, tracking_url)
+
+            for member in pickings:
+                member.with_context(mail_create_nosubscribe=True)._3pl_message_post(
+                    body=msg_body,
+                    author_id=odoobot.id if odoobot else False,
+                    message_type='notification'
+                )
+            _lap('chatter')
+
+        # Auto-validate pickings when shipped (if they WERE in waiting_3pl state)
+        # We use to_validate which was determined BEFORE writing updates
+        for member in to_validate:
+            member._3pl_auto_validate()
+
+        _logger.debug("3PL Webhook: Updated %s with tracking %s, URL: %s", order_ref, tracking_ref, tracking_url)
+        return 200, {'status': 'success', 'order_id': order_ref, 'tracking_url': tracking_url}
+
+    @api.model
+    def _3pl_update_vals(self, status=None, tracking_ref=None, tracking_url=None):
+        """
+        Map a 3PL status update (webhook or manifest line) to picking values.
+
+        Returns ``(vals, tracking_url)``: when only a tracking number is given,
+        the tracking URL is built from the configured Tracking URL Base.
+        """
+        vals = {}
+        if tracking_ref:
+            vals['x_3pl_tracking_ref'] = tracking_ref
+
+            # Build tracking URL if not provided
+            if not tracking_url:
+                tracking_url_base = self.env['ir.config_parameter'].sudo().get_param(
+                    'logistics_3pl_connector.tracking_url_base', 
+                    default='https://tracking.example.com/odoo/'
+                )
+                if tracking_url_base:
+                    # Ensure base URL ends with proper separator
+                    if not tracking_url_base.endswith('/') and not tracking_url_base.endswith('='):
+                        tracking_url_base += '/'
+                    tracking_url = f"{tracking_url_base}{tracking_ref}"
+
+        if tracking_url:
+            vals['x_3pl_tracking_url'] = tracking_url
+
+        # Map 3PL status to internal status
+        if status:
+            status_lower = status.lower()
+            if status_lower in ('shipped', 'delivered', 'completed'):
+                vals['x_3pl_status'] = 'shipped'
+            elif status_lower == 'error':
+                vals['x_3pl_status'] = 'error'
+        return vals, tracking_url
+
+    @api.model
+    def _3pl_update_message(self, status, tracking_ref, tracking_url):
+        """Chatter note for a 3PL status update, with a clickable tracking link if available."""
+        status_label = '🚚 Shipped' if status and status.lower() in ('shipped', 'delivered', 'completed') else (status or 'Updated')
+
+        if tracking_url and tracking_ref:
+            return Markup(_("3PL Update: <strong>%s</strong><br/>Tracking: <a href='%s' target='_blank'>%s</a>")) % (status_label, tracking_url, tracking_ref)
+        if tracking_ref:
+            return _("3PL Update: %s - Tracking: %s") % (status_label, tracking_ref)
+        return _("3PL Update: %s") % status_label
+
+    @api.model
+    def _3pl_import_manifest(self, rows, report, batch_size=500):
+        """
+        Apply a stream of 3PL status lines (see _iter_manifest_rows) in batches.
+
+        Each batch resolves its deliveries with one search (by name or TMS ID),
+        applies the webhook status mapping with batched writes and chatter
+        notes, then auto-validates the deliveries confirmed as shipped. Lines
+        for deliveries locked by a concurrent operation are queued as deferred
+        events, like webhooks. Every batch is committed on its own, which
+        releases its row locks for the webhooks waiting on them, and its lines
+        are only reported once committed: if a batch fails, the lines already
+        reported stay applied. The cache is cleared after every batch so memory
+        stays flat whatever the file size.
+
+        Args:
+            rows: Iterable of ``(line_no, data, error)``
+            report: Callable ``(line_no, ref, result, message)``, called once per
+                line; result is updated, validated, deferred, skipped or error
+            batch_size: Lines resolved and written together
+
+        Returns a Counter of line results.
+        """
+        counts = collections.Counter()
+
+        def emit(line_no, ref, result, message=''):
+            counts[result] += 1
+            report(line_no, ref, result, message)
+
+        for batch in split_every(batch_size, rows):
+            results = self._3pl_import_manifest_batch(batch)
+            self.env.cr.commit()
+            self.env.invalidate_all()
+            for result in results:
+                emit(*result)
+        return counts
+
+    @api.model
+    def _3pl_import_manifest_batch(self, batch):
+        """
+        Apply one batch of manifest lines, see _3pl_import_manifest.
+
+        Returns the ``(line_no, ref, result, message)`` of each line, in file order.
+        """
+        lines = []
+        results = []
+        for line_no, data, error in batch:
+            if error:
+                results.append((line_no, '', 'error', error))
+                continue
+            ref = str(data.get('order_id') or '').strip()
+            tms_id = str(data.get('tms_id') or '').strip()
+            status = str(data.get('status') or '').strip()
+            if not ref and not tms_id:
+                results.append((line_no, '', 'error', "Missing order_id or tms_id"))
+            elif status and status.lower() not in WEBHOOK_STATUSES:
+                results.append((line_no, ref or tms_id, 'error',
+                                f'Invalid status "{status}". Allowed statuses are: {", ".join(WEBHOOK_STATUSES)}'))
+            else:
+                lines.append((line_no, ref, tms_id, status, data))
+        if not lines:
+            return sorted(results, key=lambda r: r[0])
+
+        # Resolve every delivery of the batch with a single search
+        names = list({ref for _l, ref, _t, _s, _d in lines if ref})
+        tms_ids = list({tms_id for _l, ref, tms_id, _s, _d in lines if tms_id and not ref})
+        domain = [('name', 'in', names)] if names else []
+        if tms_ids:
+            domain = ['|', ('x_3pl_order_id', 'in', tms_ids)] + domain if domain else [('x_3pl_order_id', 'in', tms_ids)]
+        pickings = self.sudo().search([('picking_type_code', '=', 'outgoing')] + domain, order='id')
+        by_name = {picking.name: picking for picking in pickings}
+        by_tms_id = {}
+        for picking in pickings:
+            by_tms_id.setdefault(picking.x_3pl_order_id, picking)
+
+        # Consolidated orders: lines for the lead delivery apply to the whole order
+        members = collections.defaultdict(lambda: self.browse())
+        lead_refs = [picking.name for picking in pickings if picking.x_3pl_consolidation_ref == picking.name]
+        if lead_refs:
+            for member in self.sudo().search([('x_3pl_consolidation_ref', 'in', lead_refs)], order='id'):
+                members[member.x_3pl_consolidation_ref] |= member
+        locked = (pickings | self.browse().union(*members.values()))._3pl_lock_available()
+
+        notes = collections.defaultdict(list)
+        to_validate = {}
+        deferred_refs = set()
+        for line_no, ref, tms_id, status, data in lines:
+            picking = by_name.get(ref) if ref else by_tms_id.get(tms_id)
+            if not picking:
+                results.append((line_no, ref or tms_id, 'error', "Order not found"))
+                continue
+            if picking.x_3pl_consolidation_ref == picking.name and members.get(picking.name):
+                targets = members[picking.name]
+            else:
+                targets = picking
+
+            # Busy deliveries go through the deferred event queue, in file order
+            if picking.name in deferred_refs or targets - locked:
+                deferred_refs.add(picking.name)
+                self.env['logistics.3pl.event']._defer(picking.name, {
+                    'order_id': picking.name,
+                    'status': status,
+                    'tracking_number': data.get('tracking_number') or None,
+                    'tracking_url': data.get('tracking_url') or None,
+                })
+                results.append((line_no, picking.name, 'deferred', "Locked by another operation"))
+                continue
+
+            allowed = targets.filtered(lambda p: p.state in WEBHOOK_PICKING_STATES)
+            if not allowed:
+                results.append((line_no, picking.name, 'skipped', f'Picking is in state "{picking.state}"'))
+                continue
+            if status.lower() == 'shipped':
+                for target in allowed.filtered(lambda p: p.state == 'waiting_3pl'):
+                    to_validate[target.id] = line_no
+
+            tracking_ref = data.get('tracking_number') or None
+            vals, tracking_url = self._3pl_update_vals(status, tracking_ref, data.get('tracking_url') or None)
+            if not vals:
+                results.append((line_no, picking.name, 'skipped', "Nothing to update"))
+                continue
+            allowed.write(vals)
+            body = self._3pl_update_message(status, tracking_ref, tracking_url)
+            for target in allowed:
+                notes[target.id].append(body)
+            results.append((line_no, picking.name, 'updated', ''))
+
+        # Chatter notes in bulk: one insert per round of (at most) one note per delivery
+        odoobot = self.env.ref('base.partner_root', raise_if_not_found=False)
+        while notes:
+            bodies = {picking_id: picking_notes.pop(0) for picking_id, picking_notes in notes.items()}
+            self.browse(list(bodies))._3pl_message_log_batch(
+                bodies=bodies, author_id=odoobot.id if odoobot else None)
+            notes = {picking_id: picking_notes for picking_id, picking_notes in notes.items() if picking_notes}
+
+        validated_lines = collections.defaultdict(list)
+        for picking in self.browse(list(to_validate)):
+            picking._3pl_auto_validate()
+            validated_lines[to_validate[picking.id]].append(picking.state == 'done')
+
+        lines_results = []
+        for line_no, ref, result, message in sorted(results, key=lambda r: r[0]):
+            outcomes = validated_lines.get(line_no)
+            if outcomes and all(outcomes):
+                result = 'validated'
+            elif outcomes:
+                message = "Updated, but auto-validation failed (see server log)"
+            lines_results.append((line_no, ref, result, message))
+        return lines_results
+
+    def _3pl_auto_validate(self):
+        """Validate a picking confirmed as shipped by the 3PL, processing any wizard it returns."""
+        self.ensure_one()
+        try:
+            # A failed validation must not leave half-applied changes behind
+            with self.env.cr.savepoint():
+                _logger.debug("3PL Webhook: Attempting to auto-validate picking %s", self.name)
+
+                # Get user for validation (required because auth='none' has no user context)
+                # Priority: 1) Configured webhook user, 2) OdooBot as fallback
+                # Best practice: Configure a dedicated user with only Inventory permissions
+                webhook_user = None
+                config_param = self.env['ir.config_parameter'].sudo()
+                webhook_user_id = config_param.get_param('logistics_3pl_connector.webhook_user_id')
+
+                if webhook_user_id:
+                    try:
+                        webhook_user = self.env['res.users'].sudo().browse(int(webhook_user_id))
+                        if not webhook_user.exists() or not webhook_user.active:
+                            _logger.warning("3PL Webhook: Configured webhook user (id=%s) not found or inactive, falling back to OdooBot", webhook_user_id)
+                            webhook_user = None
+                        else:
+                            _logger.debug("3PL Webhook: Using configured webhook user: %s (id=%s)", webhook_user.name, webhook_user.id)
+                    except (ValueError, TypeError) as e:
+                        _logger.warning("3PL Webhook: Invalid webhook_user_id config: %s, falling back to OdooBot", e)
+
+                # Fallback to OdooBot if no configured user
+                if not webhook_user:
+                    # Get OdooBot user (ID=1) as fallback
+                    webhook_user = self.env['res.users'].sudo().browse(1)
+                    if webhook_user.exists():
+                        _logger.info("3PL Webhook: Using OdooBot (fallback). Consider configuring a dedicated webhook user for better security.")
+                    else:
+                        webhook_user = None
+
+                if not webhook_user or not webhook_user.exists():
+                    _logger.error("3PL Webhook: Could not find any user for validation")
+                    raise Exception("No user available for auto-validation")
+
+                # IMPORTANT: Refresh picking from database to get current state after write
+                # The webhook write lifted the waiting_3pl hold, which changed the state
+                picking = self.env['stock.picking'].with_user(webhook_user).browse(self.id)
+                picking.ensure_one()
+                _logger.debug("3PL Webhook: Picking %s current state after refresh: %s", self.name, picking.state)
+
+                # Call button_validate with context flags to:
+                # - skip_3pl_check: bypass our 3PL blocking logic
+                # - skip_3pl_auto_send: prevent recursion
+                # - skip_sms: skip SMS confirmation wizard
+                # - skip_backorder: auto-handle backorders without wizard
+                # - button_validate_picking_ids: required for batch validation
+                validate_ctx = {
+                    'skip_3pl_check': True,
+                    'skip_3pl_auto_send': True,
+                    'skip_sms': True,
+                    'skip_backorder': True,
+                    'button_validate_picking_ids': picking.ids,
+                }
+
+                # Validate the picking
+                _logger.debug("3PL Webhook: Calling button_validate for %s", self.name)
+                _lap('validate_setup')
+                result = picking.with_context(**validate_ctx).button_validate()
+                _lap('button_validate')
+                _logger.debug("3PL Webhook: button_validate returned: %s", result)
+
+                # If result is a wizard action, we need to confirm it
+                if isinstance(result, dict) and result.get('res_model'):
+                    wizard_model = result.get('res_model')
+                    wizard_id = result.get('res_id')
+                    _logger.debug("3PL Webhook: Wizard returned: %s (id=%s). Attempting to process...", wizard_model, wizard_id)
+
+                    # Try to process the wizard automatically
+                    if wizard_id and wizard_model:
+                        # Use with_user() to set webhook user context for wizard processing
+                        wizard = self.env[wizard_model].with_user(webhook_user).browse(wizard_id)
+                        if hasattr(wizard, 'process'):
+                            wizard.with_context(**validate_ctx).process()
+                            _logger.debug("3PL Webhook: Wizard %s processed", wizard_model)
+                        elif hasattr(wizard, 'action_confirm'):
+                            wizard.with_context(**validate_ctx).action_confirm()
+                            _logger.debug("3PL Webhook: Wizard %s confirmed", wizard_model)
+                        elif hasattr(wizard, 'action_done'):
+                            wizard.with_context(**validate_ctx).action_done()
+                            _logger.debug("3PL Webhook: Wizard %s done", wizard_model)
+                        _lap('wizard')
+
+                # Re-read picking to get updated state from database
+                picking.invalidate_recordset(['state'])
+                picking = self.env['stock.picking'].with_user(webhook_user).browse(picking.id)
+                _logger.info("3PL Webhook: Auto-validated picking %s. Final state: %s", self.name, picking.state)
+                if picking.state != 'done':
+                    _logger.warning("3PL Webhook: Picking %s validation completed but state is still '%s', expected 'done'", self.name, picking.state)
+        except Exception as validate_error:
+            _logger.error("3PL Webhook: Could not auto-validate %s: %s", self.name, validate_error, exc_info=True)
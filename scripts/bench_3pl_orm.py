@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Large-dataset performance check for the connector's ORM paths.
+
+Generates thousands of synthetic outgoing deliveries (partners, products,
+pickings with moves) in a test database and measures, per phase, the wall
+time and SQL query count of:
+
+* confirm_assign   action_confirm + action_assign, driving the overridden
+                   _compute_state over the whole set
+* state_recompute  flipping x_3pl_status to "sent" and back, which sets and
+                   lifts the waiting_3pl hold
+* x3pl_computes    x_3pl_eligible, x_3pl_can_resend, x_is_web_order and the
+                   stored x_3pl_leg_outdated recomputed over the whole set
+* button_validate  button_validate with auto-send enabled on a sample,
+                   posting to a local e-Transport stand-in
+* webhook_search   the picking lookup done by the webhook, on a sample
+* webhook_handle   the full webhook handler (lock, write, chatter), on a sample
+
+and, on a few deliveries with hundreds of moves each (--heavy-pickings,
+--heavy-moves), the cost of bulk x_3pl_status writes:
+
+* hold_write_heavy     setting x_3pl_status to "sent" (hold) and writing it
+                       again along with a tracking number, as resends do
+* hold_release_heavy   lifting the hold ("sent" back to "draft"), which
+                       re-derives the state of those deliveries from their moves
+* state_recompute_heavy  reference only (no budget): a full _compute_state of
+                       the same deliveries, what every status write cost when
+                       x_3pl_status was a dependency of the state
+
+Each phase has a budget in milliseconds and SQL queries per picking; the
+script exits with status 1 when a budget is exceeded, so it can gate a CI
+job. Budgets can be overridden with --budget phase=ms:queries.
+
+Everything runs in one transaction that is rolled back at the end: the
+database is left untouched. It must have stock and logistics_3pl_connector
+installed. Run it with the Odoo sources importable, for instance:
+
+    python3 scripts/bench_3pl_orm.py -c /etc/odoo/odoo.conf -d bench \\
+        --pickings 20000 --report bench.json
+
+The local e-Transport stand-in comes from replay_3pl_traffic.py.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+from replay_3pl_traffic import EtransportStandIn
+
+# Budgets per picking: (milliseconds, SQL queries)
+DEFAULT_BUDGETS = {
+    'confirm_assign': (15.0, 12.0),
+    'state_recompute': (1.0, 0.1),
+    'x3pl_computes': (1.0, 0.1),
+    'button_validate': (40.0, 30.0),
+    'webhook_search': (2.0, 1.5),
+    'webhook_handle': (30.0, 25.0),
+    'hold_write_heavy': (5.0, 2.0),
+    'hold_release_heavy': (400.0, 20.0),
+}
+
+
+class Phase:
+    """Measure wall time and query count of a block, per picking."""
+
+    def __init__(self, cr, name, count, results):
+        self.cr = cr
+        self.name = name
+        self.count = count
+        self.results = results
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        self.queries = self.cr.sql_log_count
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            return False
+        ms = (time.monotonic() - self.started) * 1000
+        queries = self.cr.sql_log_count - self.queries
+        self.results[self.name] = {
+            'records': self.count,
+            'ms': round(ms, 1),
+            'queries': queries,
+            'ms_per_record': round(ms / self.count, 3) if self.count else 0,
+            'queries_per_record': round(queries / self.count, 3) if self.count else 0,
+        }
+        return False
+
+
+def generate(env, args, results):
+    """
+    Create partners, products and outgoing pickings with moves.
+
+    Returns the ids of the regular pickings and of the heavy ones (--heavy-moves moves each).
+    """
+    from odoo.fields import Command
+
+    env = env(context=dict(env.context, tracking_disable=True, mail_create_nolog=True, mail_notrack=True))
+    rng = random.Random(args.seed)
+
+    warehouse = env['stock.warehouse'].search([('company_id', '=', env.company.id)], limit=1)
+    out_type = warehouse.out_type_id
+    customers = env.ref('stock.stock_location_customers')
+    spain = env.ref('base.es')
+
+    with Phase(env.cr, 'setup_partners', args.partners, results):
+        partners = env['res.partner'].create([{
+            'name': f"Bench Customer {i}",
+            'street': f"Calle Falsa {i}",
+            'city': 'Madrid',
+            'zip': f"{28000 + i % 100:05d}",
+            'country_id': spain.id,
+            'phone': f"+34 600 {i:06d}",
+            'email': f"bench{i}@example.com",
+        } for i in range(args.partners)])
+        env.flush_all()
+
+    with Phase(env.cr, 'setup_products', args.products, results):
+        product_vals = []
+        for i in range(args.products):
+            vals = {'name': f"Bench Product {i}", 'type': 'consu', 'weight': 0.5 + i % 7, 'volume': 0.01 * (1 + i % 5)}
+            if 'x_etransport_temperature' in env['product.template']._fields:
+                vals['x_etransport_temperature'] = ('AM', 'FR', 'CO')[i % 3]
+            product_vals.append(vals)
+        products = env['product.product'].create(product_vals)
+        env.flush_all()
+
+    Move = env['stock.move']
+    move_needs_name = 'name' in Move._fields and Move._fields['name'].required
+
+    def move_vals(product):
+        vals = {
+            'product_id': product.id,
+            'product_uom_qty': rng.randint(1, 5),
+            'location_id': out_type.default_location_src_id.id,
+            'location_dest_id': customers.id,
+        }
+        if move_needs_name:
+            vals['name'] = product.display_name
+        return Command.create(vals)
+
+    pickings = env['stock.picking']
+    with Phase(env.cr, 'setup_pickings', args.pickings, results):
+        for start in range(0, args.pickings, args.chunk):
+            pickings |= env['stock.picking'].create([{
+                'picking_type_id': out_type.id,
+                'partner_id': partners[rng.randrange(len(partners))].id,
+                'location_id': out_type.default_location_src_id.id,
+                'location_dest_id': customers.id,
+                'move_ids': [move_vals(products[rng.randrange(len(products))])
+                             for _m in range(rng.randint(1, args.max_moves))],
+            } for _i in range(start, min(start + args.chunk, args.pickings))])
+            env.flush_all()
+
+    heavy = env['stock.picking']
+    with Phase(env.cr, 'setup_heavy_pickings', args.heavy_pickings, results):
+        for _i in range(args.heavy_pickings):
+            heavy |= env['stock.picking'].create({
+                'picking_type_id': out_type.id,
+                'partner_id': partners[rng.randrange(len(partners))].id,
+                'location_id': out_type.default_location_src_id.id,
+                'location_dest_id': customers.id,
+                'move_ids': [move_vals(products[rng.randrange(len(products))]) for _m in range(args.heavy_moves)],
+            })
+        env.flush_all()
+    return pickings.ids, heavy.ids
+
+
+def run(env, args):
+    """Generate the dataset, measure every phase and return the report dict."""
+    results = {}
+    config = env['ir.config_parameter'].sudo()
+    standin = EtransportStandIn([])
+    standin.start()
+    try:
+        config.set_param('logistics_3pl_connector.api_url', standin.url)
+        config.set_param('logistics_3pl_connector.api_key', 'bench-key')
+        config.set_param('logistics_3pl_connector.warehouse_id', '')
+        config.set_param('logistics_3pl_connector.auto_send', 'True')
+        config.set_param('logistics_3pl_connector.web_orders_only', 'False')
+        config.set_param('logistics_3pl_connector.debug_mode', 'False')
+        config.set_param('logistics_3pl_connector.record_traffic', 'False')
+
+        picking_ids, heavy_ids = generate(env, args, results)
+        pickings = env['stock.picking'].browse(picking_ids)
+        cr = env.cr
+        count = len(pickings)
+
+        with Phase(cr, 'confirm_assign', count, results):
+            pickings.action_confirm()
+            pickings.action_assign()
+            env.flush_all()
+
+        assigned = pickings.filtered(lambda p: p.state == 'assigned')
+        with Phase(cr, 'state_recompute', len(assigned), results):
+            assigned.write({'x_3pl_status': 'sent'})
+            env.flush_all()
+            assigned.write({'x_3pl_status': 'draft'})
+            env.flush_all()
+
+        Picking = env['stock.picking']
+        with Phase(cr, 'x3pl_computes', count, results):
+            pickings.invalidate_recordset(['x_3pl_eligible', 'x_3pl_can_resend', 'x_is_web_order'])
+            pickings.mapped('x_3pl_eligible')
+            pickings.mapped('x_3pl_can_resend')
+            pickings.mapped('x_is_web_order')
+            env.add_to_compute(Picking._fields['x_3pl_leg_outdated'], pickings)
+            pickings.flush_recordset(['x_3pl_leg_outdated'])
+
+        rng = random.Random(args.seed)
+        sample = Picking.browse(rng.sample(assigned.ids, min(args.validate_sample, len(assigned))))
+        with Phase(cr, 'button_validate', len(sample), results):
+            for picking in sample:
+                picking.button_validate()
+            env.flush_all()
+        waiting = sample.filtered(lambda p: p.state == 'waiting_3pl')
+        results['button_validate']['sent_to_3pl'] = len(waiting)
+
+        names = rng.sample(pickings.mapped('name'), min(args.webhook_sample, count))
+        with Phase(cr, 'webhook_search', len(names), results):
+            for name in names:
+                Picking.sudo().search([('name', '=', name)], limit=1)
+
+        webhook_names = waiting.mapped('name') or names
+        with Phase(cr, 'webhook_handle', len(webhook_names), results):
+            for seq, name in enumerate(webhook_names):
+                Picking.sudo()._3pl_handle_webhook({'order_id': name, 'tracking_number': f"BENCH-{seq}"})
+            env.flush_all()
+
+        heavy = Picking.browse(heavy_ids)
+        with Phase(cr, 'setup_heavy_assign', len(heavy), results):
+            heavy.action_confirm()
+            heavy.action_assign()
+            env.flush_all()
+        heavy = heavy.filtered(lambda p: p.state == 'assigned')
+
+        with Phase(cr, 'hold_write_heavy', len(heavy), results):
+            heavy.write({'x_3pl_status': 'sent'})
+            env.flush_all()
+            heavy.write({'x_3pl_status': 'sent', 'x_3pl_tracking_ref': 'BENCH-HEAVY'})
+            env.flush_all()
+        results['hold_write_heavy']['waiting_3pl'] = len(heavy.filtered(lambda p: p.state == 'waiting_3pl'))
+
+        with Phase(cr, 'hold_release_heavy', len(heavy), results):
+            heavy.write({'x_3pl_status': 'draft'})
+            env.flush_all()
+
+        with Phase(cr, 'state_recompute_heavy', len(heavy), results):
+            env.add_to_compute(Picking._fields['state'], heavy)
+            heavy.flush_recordset(['state'])
+    finally:
+        standin.stop()
+
+    return {'pickings': args.pickings, 'results': results}
+
+
+def check_budgets(report, budgets):
+    breaches = []
+    for phase, (max_ms, max_queries) in budgets.items():
+        result = report['results'].get(phase)
+        if not result or not result['records']:
+            continue
+        if result['ms_per_record'] > max_ms:
+            breaches.append(f"{phase}: {result['ms_per_record']} ms/picking > {max_ms}")
+        if result['queries_per_record'] > max_queries:
+            breaches.append(f"{phase}: {result['queries_per_record']} queries/picking > {max_queries}")
+    return breaches
+
+
+def print_report(report, budgets):
+    print(f"{'phase':<18}{'records':>9}{'total ms':>12}{'queries':>10}{'ms/rec':>10}{'q/rec':>9}  budget")
+    for phase, result in report['results'].items():
+        budget = budgets.get(phase)
+        budget_str = f"{budget[0]} ms, {budget[1]} q" if budget else '-'
+        print(f"{phase:<18}{result['records']:>9}{result['ms']:>12}{result['queries']:>10}"
+              f"{result['ms_per_record']:>10}{result['queries_per_record']:>9}  {budget_str}")
+
+
+def parse_budget(value):
+    try:
+        phase, limits = value.split('=', 1)
+        max_ms, max_queries = limits.split(':', 1)
+        return phase, (float(max_ms), float(max_queries))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected phase=ms:queries, got {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-c', '--config', help="Odoo configuration file")
+    parser.add_argument('-d', '--db', required=True)
+    parser.add_argument('--pickings', type=int, default=10000)
+    parser.add_argument('--partners', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=500)
+    parser.add_argument('--max-moves', type=int, default=3, help="Moves per picking (1..N)")
+    parser.add_argument('--chunk', type=int, default=1000, help="Pickings created per create() call")
+    parser.add_argument('--heavy-pickings', type=int, default=50, help="Pickings with many moves")
+    parser.add_argument('--heavy-moves', type=int, default=300, help="Moves per heavy picking")
+    parser.add_argument('--validate-sample', type=int, default=500)
+    parser.add_argument('--webhook-sample', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=3)
+    parser.add_argument('--budget', type=parse_budget, action='append', default=[],
+                        help="Override a phase budget, e.g. confirm_assign=20:15 (ms:queries per picking)")
+    parser.add_argument('--report', help="Write the measurements to this JSON file")
+    args = parser.parse_args(argv)
+
+    import odoo
+    from odoo.modules.registry import Registry
+    from odoo.tools import config
+
+    config.parse_config(['-c', args.config] if args.config else [])
+    budgets = dict(DEFAULT_BUDGETS, **dict(args.budget))
+
+    cr = Registry(args.db).cursor()
+    try:
+        env = odoo.api.Environment(cr, odoo.api.SUPERUSER_ID, {})
+        report = run(env, args)
+    finally:
+        cr.rollback()
+        cr.close()
+
+    print_report(report, budgets)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(dict(report, budgets=budgets), f, indent=2)
+
+    breaches = check_budgets(report, budgets)
+    if breaches:
+        print("BUDGET EXCEEDED:\n  " + '\n  '.join(breaches))
+        return 1
+    print("all phases within budget")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
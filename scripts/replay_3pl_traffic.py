@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Replay captured 3PL traffic against a test Odoo database.
+
+The connector writes a JSON Lines capture when "Record Traffic" is enabled in
+Inventory Settings (see _record_traffic in models/stock_picking.py). Each line
+is one exchange:
+
+    {"ts": ..., "kind": "webhook" | "import" | "tracking", "method": ..., "path": ...,
+     "ref": ..., "request": ..., "status": ..., "response": ..., "ms": ...}
+
+This runner:
+
+* starts a local e-Transport stand-in that answers /tms/import-data and
+  /tms/tracking/<ref> with the recorded responses (or a synthetic success),
+* re-posts recorded webhooks to Odoo at original speed, accelerated (--speed)
+  or as fast as possible (--speed 0),
+* optionally (with --db/--login/--password) re-triggers the recorded sends
+  and tracking fetches through JSON-RPC, so the payloads Odoo builds now can
+  be compared with the recorded ones,
+* reports throughput, latency and every behavior difference, and can compare
+  the run with a previous report (--baseline) to spot regressions between
+  versions.
+
+Example:
+
+    python3 scripts/replay_3pl_traffic.py /tmp/3pl_traffic.jsonl \\
+        --odoo-url http://localhost:8069 --api-key test-key \\
+        --db replay --login admin --password admin --speed 10 --report run.json
+
+Only the standard library and requests are required.
+"""
+import argparse
+import itertools
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import requests
+
+WEBHOOK_PATH = '/api/v1/3pl/webhook'
+
+
+def load_capture(path, kinds):
+    """Read a capture file, skipping blank or truncated lines."""
+    events = []
+    with open(path, encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                print(f"warning: skipping unreadable line {lineno}", file=sys.stderr)
+                continue
+            if event.get('kind') in kinds:
+                events.append(event)
+    events.sort(key=lambda e: e.get('ts', 0))
+    return events
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(int(round(pct / 100.0 * (len(values) - 1))), len(values) - 1)
+    return round(values[index], 1)
+
+
+class EtransportStandIn:
+    """Minimal local e-Transport answering from recorded responses."""
+
+    def __init__(self, events, host='127.0.0.1', port=0):
+        self.import_responses = {}
+        self.recorded_orders = {}
+        self.tracking_responses = {}
+        for event in events:
+            if event['kind'] == 'import':
+                request_body = event.get('request') or {}
+                for order in request_body.get('Orders', []) if isinstance(request_body, dict) else []:
+                    ref = order.get('ExternalRef')
+                    self.recorded_orders[ref] = order
+                    self.import_responses[ref] = (event.get('status', 200), event.get('response'))
+            elif event['kind'] == 'tracking':
+                self.tracking_responses[event.get('ref')] = (event.get('status', 200), event.get('response'))
+
+        self.received_orders = {}
+        self.calls = 0
+        self._ids = itertools.count(900000)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = body if isinstance(body, str) else json.dumps(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(data.encode('utf-8'))
+
+            def do_POST(self):
+                if not self.path.endswith('/tms/import-data'):
+                    return self._reply(404, {'status': 'error', 'message': 'not found'})
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    return self._reply(400, {'status': 'error', 'errors': ['invalid json']})
+                orders = body.get('Orders', [])
+                with standin._lock:
+                    standin.calls += 1
+                    for order in orders:
+                        standin.received_orders[order.get('ExternalRef')] = order
+                # Replay the recorded answer when this is a single known order
+                if len(orders) == 1 and orders[0].get('ExternalRef') in standin.import_responses:
+                    status, response = standin.import_responses[orders[0]['ExternalRef']]
+                    return self._reply(status, response)
+                mapping = {order.get('ExternalRef'): next(standin._ids) for order in orders}
+                return self._reply(200, {
+                    'status': 'success',
+                    'orders_created': len(orders),
+                    'orders_updated': 0,
+                    'warnings': [],
+                    'errors': [],
+                    'mapping': {'orders': mapping},
+                })
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                marker = '/tms/tracking/'
+                if marker not in path:
+                    return self._reply(404, {'status': 'error', 'message': 'not found'})
+                ref = unquote(path.split(marker, 1)[1])
+                with standin._lock:
+                    standin.calls += 1
+                status, response = standin.tracking_responses.get(
+                    ref, (404, {'status': 'error', 'message': f'Order {ref} not found'}))
+                return self._reply(status, response)
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+    def payload_diffs(self):
+        diffs = []
+        for ref, received in sorted(self.received_orders.items(), key=lambda item: str(item[0])):
+            recorded = self.recorded_orders.get(ref)
+            if recorded is not None and recorded != received:
+                diffs.append({'kind': 'import-payload', 'ref': ref, 'recorded': recorded, 'replayed': received})
+        return diffs
+
+
+class OdooRPC:
+    """Tiny JSON-RPC client used to re-trigger sends and tracking fetches."""
+
+    def __init__(self, url, db, login, password):
+        self.url = url.rstrip('/') + '/jsonrpc'
+        self.db = db
+        self.password = password
+        self.uid = self._call('common', 'login', db, login, password)
+        if not self.uid:
+            raise SystemExit("error: Odoo login failed")
+
+    def _call(self, service, method, *args):
+        response = requests.post(self.url, json={
+            'jsonrpc': '2.0', 'method': 'call',
+            'params': {'service': service, 'method': method, 'args': args},
+        }, timeout=300)
+        data = response.json()
+        if data.get('error'):
+            raise RuntimeError(data['error'].get('data', {}).get('message') or data['error'].get('message'))
+        return data.get('result')
+
+    def execute(self, model, method, *args, **kwargs):
+        return self._call('object', 'execute_kw', self.db, self.uid, self.password, model, method, list(args), kwargs)
+
+
+class Replayer:
+
+    def __init__(self, args, events, standin):
+        self.args = args
+        self.events = events
+        self.standin = standin
+        self.session = requests.Session()
+        self.rpc = None
+        if args.db:
+            self.rpc = OdooRPC(args.odoo_url, args.db, args.login, args.password)
+        self.results = []
+        self._lock = threading.Lock()
+
+    def _replay_webhook(self, event):
+        body = event.get('request') or ''
+        response = self.session.post(
+            self.args.odoo_url.rstrip('/') + WEBHOOK_PATH,
+            data=body.encode('utf-8') if isinstance(body, str) else json.dumps(body),
+            headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {self.args.api_key}'},
+            timeout=300,
+        )
+        try:
+            replayed_body = response.json()
+        except ValueError:
+            replayed_body = response.text
+        return response.status_code, replayed_body
+
+    def _replay_action(self, event, method):
+        refs = [ref for ref in (event.get('ref') or '').split(',') if ref]
+        ids = self.rpc.execute('stock.picking', 'search', [('name', 'in', refs)])
+        if len(ids) != len(refs):
+            return 404, {'status': 'error', 'message': 'picking not found in replay database'}
+        for picking_id in ids:
+            try:
+                self.rpc.execute('stock.picking', method, [picking_id])
+            except RuntimeError as e:
+                return 500, {'status': 'error', 'message': str(e)}
+        return event.get('status'), event.get('response')
+
+    def _run_one(self, event):
+        started = time.monotonic()
+        try:
+            if event['kind'] == 'webhook':
+                status, body = self._replay_webhook(event)
+            elif event['kind'] == 'import':
+                status, body = self._replay_action(event, 'action_send_to_3pl')
+            else:
+                status, body = self._replay_action(event, 'action_fetch_tracking')
+        except Exception as e:  # network errors are results too
+            status, body = None, {'status': 'error', 'message': str(e)}
+        latency = (time.monotonic() - started) * 1000
+
+        result = {
+            'kind': event['kind'],
+            'ref': event.get('ref', ''),
+            'latency_ms': latency,
+            'recorded_ms': event.get('ms'),
+            'status': status,
+            'recorded_status': event.get('status'),
+        }
+        if status != event.get('status') or (event['kind'] == 'webhook' and body != event.get('response')):
+            result['diff'] = {'recorded': event.get('response'), 'replayed': body}
+        with self._lock:
+            self.results.append(result)
+
+    def run(self):
+        replayable = [e for e in self.events if e['kind'] == 'webhook' or self.rpc]
+        skipped = len(self.events) - len(replayable)
+        if skipped:
+            print(f"note: {skipped} outbound events skipped (pass --db/--login/--password to replay them)")
+        if not replayable:
+            return 0.0
+
+        origin = replayable[0].get('ts', 0)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            for event in replayable:
+                if self.args.speed > 0:
+                    due = (event.get('ts', origin) - origin) / self.args.speed
+                    delay = due - (time.monotonic() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+                executor.submit(self._run_one, event)
+        return time.monotonic() - started
+
+
+def build_report(results, wall_time, payload_diffs, standin_calls):
+    report = {'wall_time_s': round(wall_time, 3), 'standin_calls': standin_calls, 'kinds': {}, 'diffs': []}
+    for kind in ('webhook', 'import', 'tracking'):
+        rows = [r for r in results if r['kind'] == kind]
+        if not rows:
+            continue
+        latencies = [r['latency_ms'] for r in rows]
+        recorded = [r['recorded_ms'] for r in rows if r.get('recorded_ms') is not None]
+        report['kinds'][kind] = {
+            'count': len(rows),
+            'throughput_per_s': round(len(rows) / wall_time, 2) if wall_time else None,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': round(max(latencies), 1),
+            'mean_ms': round(statistics.mean(latencies), 1),
+            'recorded_p50_ms': percentile(recorded, 50),
+            'recorded_p95_ms': percentile(recorded, 95),
+            'diffs': sum(1 for r in rows if 'diff' in r),
+        }
+    report['diffs'] = [
+        {'kind': r['kind'], 'ref': r['ref'], 'recorded_status': r['recorded_status'],
+         'status': r['status'], **r['diff']}
+        for r in results if 'diff' in r
+    ] + payload_diffs
+    return report
+
+
+def print_report(report, baseline=None):
+    print(f"\nReplay finished in {report['wall_time_s']}s ({report['standin_calls']} stand-in calls)")
+    print(f"{'kind':<10}{'count':>8}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'rec p95':>10}{'diffs':>8}")
+    for kind, stats in report['kinds'].items():
+        print(f"{kind:<10}{stats['count']:>8}{stats['throughput_per_s'] or '-':>10}{stats['p50_ms']:>10}"
+              f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['recorded_p95_ms'] or '-':>10}{stats['diffs']:>8}")
+        if baseline and kind in baseline.get('kinds', {}):
+            base = baseline['kinds'][kind]
+            print(f"{'  vs base':<10}{'':>8}{_delta(stats['throughput_per_s'], base.get('throughput_per_s')):>10}"
+                  f"{_delta(stats['p50_ms'], base.get('p50_ms')):>10}{_delta(stats['p95_ms'], base.get('p95_ms')):>10}"
+                  f"{_delta(stats['p99_ms'], base.get('p99_ms')):>10}")
+
+    for diff in report['diffs'][:20]:
+        print(f"\n[{diff['kind']}] {diff['ref']}")
+        print(f"  recorded: {json.dumps(diff.get('recorded'), ensure_ascii=False)[:300]}")
+        print(f"  replayed: {json.dumps(diff.get('replayed'), ensure_ascii=False)[:300]}")
+    if len(report['diffs']) > 20:
+        print(f"\n... {len(report['diffs']) - 20} more differences, see --report output")
+
+    if baseline is not None:
+        current = {(d['kind'], d['ref']) for d in report['diffs']}
+        previous = {(d['kind'], d['ref']) for d in baseline.get('diffs', [])}
+        print(f"\nNew differences vs baseline: {len(current - previous)}, fixed: {len(previous - current)}")
+
+
+def _delta(current, base):
+    if current is None or not base:
+        return '-'
+    return f"{(current - base) / base * 100:+.0f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('capture', help="JSON Lines capture written by the connector")
+    parser.add_argument('--odoo-url', default='http://localhost:8069')
+    parser.add_argument('--api-key', required=True, help="API key configured in the replay database")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Time acceleration factor (1 = original pace, 0 = as fast as possible)")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--kinds', default='webhook,import,tracking')
+    parser.add_argument('--standin-port', type=int, default=0, help="Port for the local e-Transport stand-in")
+    parser.add_argument('--db', help="Replay database, enables replaying outbound sends and tracking")
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--report', help="Write the JSON report to this file")
+    parser.add_argument('--baseline', help="Previous JSON report to compare against")
+    args = parser.parse_args(argv)
+
+    events = load_capture(args.capture, set(args.kinds.split(',')))
+    if not events:
+        raise SystemExit("error: nothing to replay")
+
+    standin = EtransportStandIn(events, port=args.standin_port)
+    standin.start()
+    print(f"e-Transport stand-in listening on {standin.url}")
+
+    replayer = Replayer(args, events, standin)
+    previous_api_url = None
+    if replayer.rpc:
+        # Point the replay database at the stand-in for the duration of the run
+        previous_api_url = replayer.rpc.execute(
+            'ir.config_parameter', 'get_param', 'logistics_3pl_connector.api_url')
+        replayer.rpc.execute('ir.config_parameter', 'set_param', 'logistics_3pl_connector.api_url', standin.url)
+    try:
+        wall_time = replayer.run()
+    finally:
+        if replayer.rpc:
+            replayer.rpc.execute('ir.config_parameter', 'set_param',
+                                 'logistics_3pl_connector.api_url', previous_api_url or '')
+        standin.stop()
+
+    report = build_report(replayer.results, wall_time, standin.payload_diffs(), standin.calls)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    return 1 if report['diffs'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for the 3PL webhook.
+
+Fires bursts of concurrent webhooks at the same pickings of a test database
+(optionally while sending them to e-Transport at the same time) and checks
+afterwards, through JSON-RPC, that every accepted update reached the chatter:
+an accepted webhook (200, or 202 once its deferred event is applied) without
+its "3PL Update" message is a lost update.
+
+If the Odoo server log is given, the serialization failures Odoo retried
+during the run are counted too, to compare versions of the connector.
+
+Example:
+
+    python3 scripts/stress_3pl_webhooks.py --odoo-url http://localhost:8069 \\
+        --api-key test-key --db stress --login admin --password admin \\
+        --pickings WH/OUT/00010,WH/OUT/00011 --per-picking 20 --concurrency 16 \\
+        --odoo-log /var/log/odoo/odoo.log
+"""
+import argparse
+import collections
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from replay_3pl_traffic import OdooRPC, WEBHOOK_PATH, percentile
+
+
+def count_serialization_retries(log_path, offset):
+    if not log_path or not os.path.exists(log_path):
+        return None
+    with open(log_path, encoding='utf-8', errors='replace') as f:
+        f.seek(offset)
+        return sum(1 for line in f if 'could not serialize access' in line or 'SerializationFailure' in line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--odoo-url', default='http://localhost:8069')
+    parser.add_argument('--api-key', required=True)
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--login', default='admin')
+    parser.add_argument('--password', default='admin')
+    parser.add_argument('--pickings', required=True, help="Comma-separated picking names (assigned or waiting_3pl)")
+    parser.add_argument('--per-picking', type=int, default=20, help="Webhooks fired per picking")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--with-sends', action='store_true',
+                        help="Also call action_send_to_3pl on the pickings during the burst")
+    parser.add_argument('--odoo-log', help="Odoo server log, to count serialization retries")
+    parser.add_argument('--drain-timeout', type=int, default=120)
+    args = parser.parse_args(argv)
+
+    rpc = OdooRPC(args.odoo_url, args.db, args.login, args.password)
+    names = [name.strip() for name in args.pickings.split(',') if name.strip()]
+    pickings = {p['name']: p['id'] for p in rpc.execute(
+        'stock.picking', 'search_read', [('name', 'in', names)], fields=['name'])}
+    missing = set(names) - set(pickings)
+    if missing:
+        raise SystemExit(f"error: pickings not found: {', '.join(sorted(missing))}")
+
+    def message_count(picking_id):
+        return rpc.execute('mail.message', 'search_count', [
+            ('model', '=', 'stock.picking'), ('res_id', '=', picking_id), ('body', 'ilike', '3PL Update'),
+        ])
+
+    before = {name: message_count(pid) for name, pid in pickings.items()}
+    log_offset = os.path.getsize(args.odoo_log) if args.odoo_log and os.path.exists(args.odoo_log) else 0
+
+    run_id = uuid.uuid4().hex[:6]
+    session = requests.Session()
+    url = args.odoo_url.rstrip('/') + WEBHOOK_PATH
+    headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {args.api_key}'}
+
+    def fire(name, seq):
+        body = {'order_id': name, 'tracking_number': f'STRESS-{run_id}-{seq}'}
+        started = time.monotonic()
+        response = session.post(url, data=json.dumps(body), headers=headers, timeout=300)
+        return name, response.status_code, (time.monotonic() - started) * 1000
+
+    def send(name):
+        try:
+            rpc.execute('stock.picking', 'action_send_to_3pl', [pickings[name]])
+            return name, 'send-ok', 0
+        except RuntimeError as e:
+            return name, f'send-error: {e}', 0
+
+    jobs = [(fire, name, seq) for seq in range(args.per_picking) for name in names]
+    if args.with_sends:
+        jobs[len(jobs) // 2:len(jobs) // 2] = [(send, name, None) for name in names]
+
+    # Wall clock for the create_date filter below, monotonic clock for durations
+    started_at = time.time()
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = [executor.submit(func, name) if seq is None else executor.submit(func, name, seq)
+                   for func, name, seq in jobs]
+        results = [future.result() for future in futures]
+    wall_time = time.monotonic() - started
+
+    codes = collections.Counter(code for _name, code, _ms in results)
+    accepted = collections.Counter(name for name, code, _ms in results if code in (200, 202))
+
+    # Wait for deferred events to be applied by the cron
+    deadline = time.monotonic() + args.drain_timeout
+    while rpc.execute('logistics.3pl.event', 'search_count', [('state', '=', 'pending')]):
+        if time.monotonic() > deadline:
+            print("warning: deferred events still pending after the drain timeout")
+            break
+        time.sleep(1)
+    failed_events = rpc.execute('logistics.3pl.event', 'search_count', [
+        ('state', '=', 'failed'), ('create_date', '>=', time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(started_at - 60))),
+    ])
+
+    lost = {}
+    for name, picking_id in pickings.items():
+        applied = message_count(picking_id) - before[name]
+        if applied < accepted[name]:
+            lost[name] = accepted[name] - applied
+
+    latencies = [ms for _name, code, ms in results if isinstance(code, int)]
+    print(f"{len(results)} requests in {wall_time:.2f}s ({len(results) / wall_time:.1f}/s)")
+    print("responses: " + ', '.join(f"{code}={count}" for code, count in sorted(codes.items(), key=str)))
+    print(f"latency p50={percentile(latencies, 50)}ms p95={percentile(latencies, 95)}ms "
+          f"p99={percentile(latencies, 99)}ms")
+    print(f"deferred events failed: {failed_events}")
+    retries = count_serialization_retries(args.odoo_log, log_offset)
+    if retries is not None:
+        print(f"serialization failures retried by Odoo: {retries}")
+    if lost:
+        print("LOST UPDATES: " + ', '.join(f"{name}: {count}" for name, count in lost.items()))
+        return 1
+    print("no lost updates")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1 @@
+from . import logistics_3pl_manifest_import
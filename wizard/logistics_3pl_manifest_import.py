@@ -0,0 +1,90 @@
+import base64
+import csv
+import io
+import logging
+import tempfile
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+from ..models.stock_picking import _iter_manifest_rows, _manifest_format
+
+_logger = logging.getLogger(__name__)
+
+
+class Logistics3PLManifestImport(models.TransientModel):
+    """
+    Apply an end-of-day e-Transport status manifest (CSV or JSON Lines).
+
+    The file is read line by line straight from the filestore and applied in
+    batches by stock.picking._3pl_import_manifest; the per-line results are
+    written to a CSV report.
+    """
+    _name = 'logistics.3pl.manifest.import'
+    _description = "Import e-Transport Status Manifest"
+
+    file = fields.Binary(string="Manifest File", required=True, attachment=True)
+    filename = fields.Char(string="File Name")
+    file_format = fields.Selection([
+        ('auto', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+    ], string="Format", default='auto', required=True)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft', required=True)
+    line_count = fields.Integer(string="Lines", readonly=True)
+    updated_count = fields.Integer(string="Updated", readonly=True)
+    validated_count = fields.Integer(string="Validated", readonly=True)
+    deferred_count = fields.Integer(string="Deferred", readonly=True)
+    skipped_count = fields.Integer(string="Skipped", readonly=True)
+    error_count = fields.Integer(string="Errors", readonly=True)
+    report_file = fields.Binary(string="Report", readonly=True, attachment=True)
+    report_filename = fields.Char(readonly=True)
+
+    def _open_file(self):
+        """Binary stream of the uploaded file, read from the filestore when possible."""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'file'),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_("Please upload a manifest file."))
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+
+    def action_import(self):
+        self.ensure_one()
+        file_format = self.file_format if self.file_format != 'auto' else _manifest_format(self.filename)
+
+        with self._open_file() as binary, tempfile.TemporaryFile('w+', encoding='utf-8', newline='') as report:
+            writer = csv.writer(report)
+            writer.writerow(['line', 'order', 'result', 'message'])
+            text = io.TextIOWrapper(binary, encoding='utf-8-sig', errors='replace', newline='')
+            counts = self.env['stock.picking']._3pl_import_manifest(
+                _iter_manifest_rows(text, file_format),
+                lambda line_no, ref, result, message: writer.writerow([line_no, ref, result, message]),
+            )
+            report.seek(0)
+            report_data = report.read().encode('utf-8')
+
+        _logger.info("e-Transport manifest %s imported: %s", self.filename, dict(counts))
+        self.write({
+            'state': 'done',
+            'line_count': sum(counts.values()),
+            'updated_count': counts['updated'],
+            'validated_count': counts['validated'],
+            'deferred_count': counts['deferred'],
+            'skipped_count': counts['skipped'],
+            'error_count': counts['error'],
+            'report_file': base64.b64encode(report_data),
+            'report_filename': f"{(self.filename or 'manifest').rsplit('.', 1)[0]}_report.csv",
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }